@@ -36,7 +36,7 @@ def build_pdf(note_path):
             return False
     return False
 
-def build_html(note_path):
+def html_needs_rebuild(note_path):
     note_name = note_path.stem
     # Skip meta files
     if "demo" in note_name or "debug" in note_name:
@@ -44,28 +44,30 @@ def build_html(note_path):
         
     html_path = HTML_DIR / f"{note_name}.html"
     
-    # tex-to-html.py handles its own output path usually, but let's be explicit
     # Check modification of tex vs html
     # AND check modification of the script itself!
     script_mtime = Path("scripts/tex-to-html.py").stat().st_mtime
     
-    rebuild = False
     if not html_path.exists():
-        rebuild = True
-    elif note_path.stat().st_mtime > html_path.stat().st_mtime:
-        rebuild = True
-    elif script_mtime > html_path.stat().st_mtime:
-        rebuild = True
-        
-    if rebuild:
-        print(f"Building HTML: {note_name}")
-        cmd = ["python3", "scripts/tex-to-html.py", str(note_path), str(html_path)]
-        res = subprocess.run(cmd, capture_output=True)
-        if res.returncode != 0:
-            print(f"Error building HTML {note_name}:\n{res.stderr.decode()}")
-            return False
         return True
-    return False
+    html_mtime = html_path.stat().st_mtime
+    return note_path.stat().st_mtime > html_mtime or script_mtime > html_mtime
+
+def build_html(notes):
+    # One tex-to-html.py run for all stale notes: the backlinks/title maps are
+    # built once and the notes are converted in parallel by the script itself
+    stale = [note_path for note_path in notes if html_needs_rebuild(note_path)]
+    if not stale:
+        return False
+
+    for note_path in stale:
+        print(f"Building HTML: {note_path.stem}")
+    cmd = ["python3", "scripts/tex-to-html.py", "--outdir", str(HTML_DIR)] + [str(p) for p in stale]
+    res = subprocess.run(cmd, capture_output=True)
+    if res.returncode != 0:
+        print(f"Error building HTML:\n{res.stdout.decode()}{res.stderr.decode()}")
+        return False
+    return True
 
 def build_all(target="all"):
     NOTES_DIR.mkdir(exist_ok=True)
@@ -95,11 +97,11 @@ def build_all(target="all"):
     
     # Build both PDF and HTML for all notes
     pool.map(build_pdf, notes)
-    pool.map(build_html, notes)
-        
     pool.close()
     pool.join()
 
+    build_html(notes)
+
 if __name__ == "__main__":
     target = sys.argv[1] if len(sys.argv) > 1 else "all"
     build_all(target)
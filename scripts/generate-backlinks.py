@@ -18,6 +18,11 @@ ROOT = Path(__file__).parent.parent
 NOTES_DIR = ROOT / "notes"
 METADATA_FILE = ROOT / ".gwiki-metadata.json"
 
+# Matched over the whole file at once; [^}\n] keeps a target on one line
+_WREF_RE = re.compile(r'\\wref\{([^}\n]+)\}')
+# Line breaks str.splitlines() honours besides \n; text mode already folds \r
+_RARE_LINE_BREAKS = ('\v', '\f', '\x1c', '\x1d', '\x1e', '\x85', '\u2028', '\u2029')
+
 
 def extract_wref_links(tex_file: Path):
     """Extract all \wref{target} links from a file."""
@@ -26,27 +31,32 @@ def extract_wref_links(tex_file: Path):
     except Exception:
         return []
 
+    # Comment lines are those of str.splitlines(), which also break at
+    # \f, \v and a few Unicode separators
+    if any(brk in content for brk in _RARE_LINE_BREAKS):
+        content = '\n'.join(content.splitlines())
+
     targets = []
-    lines = content.splitlines()
 
-    for line in lines:
+    # Find all \wref{target} patterns in one pass over the file
+    for match in _WREF_RE.finditer(content):
         # Skip comments
-        if re.match(r'^\s*%', line):
+        start = match.start()
+        line_start = content.rfind('\n', 0, start) + 1
+        if content[line_start:start].lstrip().startswith('%'):
             continue
 
-        # Find all \wref{target} patterns
-        for match in re.finditer(r'\\wref\{([^}]+)\}', line):
-            target = match.group(1)
+        target = match.group(1)
 
-            # Strip section references
-            if '#' in target:
-                target = target.split('#')[0]
+        # Strip section references
+        if '#' in target:
+            target = target.split('#')[0]
 
-            # Skip internal references
-            if target.startswith('#'):
-                continue
+        # Skip internal references
+        if target.startswith('#'):
+            continue
 
-            targets.append(target.strip())
+        targets.append(target.strip())
 
     return targets
 
@@ -376,36 +376,38 @@ def protect_math(text):
     
     return text, tokens
 
+_MATH_TOKEN_RE = re.compile(r'__MATH_TOKEN_(\d+)__')
+
 def restore_math(text, tokens):
     """Restore math blocks from tokens with smart spacing"""
-    for i, token in enumerate(tokens):
-        placeholder = f"__MATH_TOKEN_{i}__"
-        
-        idx = text.find(placeholder)
-        if idx == -1:
-            # Fallback if somehow missing
-            text = text.replace(placeholder, token)
-            continue
-            
+    if not tokens:
+        return text
+
+    def replace_func(match):
+        i = int(match.group(1))
+        if i >= len(tokens):
+            return match.group(0)
+
         prefix = ""
         # Check char before: if alnum or closing punctuation, add space
-        if idx > 0:
-            c = text[idx-1]
+        start = match.start()
+        if start > 0:
+            c = text[start-1]
             if (c.isalnum() or c in ')}],.') and not c.isspace():
                 prefix = " "
-                
+
         suffix = ""
         # Check char after: if alnum (start of word), add space
-        end_idx = idx + len(placeholder)
+        end_idx = match.end()
         if end_idx < len(text):
             c = text[end_idx]
             if c.isalnum() and not c.isspace():
                 suffix = " "
-        
-        replacement = prefix + token + suffix
-        text = text.replace(placeholder, replacement)
-                 
-    return text
+
+        return prefix + tokens[i] + suffix
+
+    # One scan over the text rather than a find/replace per token
+    return _MATH_TOKEN_RE.sub(replace_func, text)
 
 def clean_math(text):
     """Clean up math mode transitions"""
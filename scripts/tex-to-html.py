@@ -4,12 +4,17 @@ GWiki LaTeX to HTML Converter
 Converts GWiki LaTeX notes to standalone HTML pages with MathJax and TikZJax
 """
 
+import functools
+import json
 import re
 import sys
 import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
 from pathlib import Path
 from datetime import datetime
 
+_TAGS_RE = re.compile(r'\\Tags\{([^}]*)\}')
+
 def extract_metadata(content):
     """Extract title and tags from LaTeX source"""
     # Simple regex for Tags is usually ok as they don't contain nested braces often,
@@ -31,12 +36,14 @@ def extract_metadata(content):
 
     # Tags still use regex for simplicity as brace counting everything is slow/complex 
     # and Tags usually simple.
-    tags_match = re.search(r'\\Tags\{([^}]*)\}', content)
+    tags_match = _TAGS_RE.search(content)
     tags_raw = tags_match.group(1) if tags_match else ""
     tags = [t.strip() for t in tags_raw.split(',') if t.strip()]
 
     return title, tags
 
+_NEWCOMMAND_RE = re.compile(r'\\(?:re)?newcommand\s*\{\\(\w+)\}')
+
 def extract_custom_macros(content):
     """Parse \\newcommand and \\renewcommand definitions from content."""
     macros = {}
@@ -55,7 +62,7 @@ def extract_custom_macros(content):
     n = len(content)
     while True:
         # Find command start
-        match = re.search(r'\\(?:re)?newcommand\s*\{\\(\w+)\}', content[idx:])
+        match = _NEWCOMMAND_RE.search(content[idx:])
         if not match:
             break
             
@@ -102,48 +109,59 @@ def extract_custom_macros(content):
         
     return macros
 
+def _find_command(text, cmd, start=0):
+    """Index of the first cmd at or after start not followed by a word character, or -1."""
+    idx = text.find(cmd, start)
+    while idx != -1:
+        end = idx + len(cmd)
+        if end == len(text) or not (text[end].isalnum() or text[end] == '_'):
+            return idx
+        idx = text.find(cmd, end)
+    return -1
+
 def extract_body(content):
     r"""Extract content between \NoteHeader and \References"""
-    # 1. Try extracting between \NoteHeader and \References or \Footer
-    match = re.search(r'\\NoteHeader\s*(.*?)(?=\\References\b|\\Footer\b)', content, re.DOTALL)
-    if match:
-        return match.group(1).strip()
-
-    # 2. Try extracting from \NoteHeader to \end{document}
-    match = re.search(r'\\NoteHeader\s*(.*)', content, re.DOTALL)
-    if match:
-        body = match.group(1)
-        # Find the LAST \end{document} to valid nesting
-        last_end = body.rfind(r'\end{document}')
+    header = content.find(r'\NoteHeader')
+    if header != -1:
+        start = header + len(r'\NoteHeader')
+
+        # 1. Try extracting between \NoteHeader and \References or \Footer
+        ends = [i for i in (_find_command(content, r'\References', start),
+                            _find_command(content, r'\Footer', start)) if i != -1]
+        if ends:
+            return content[start:min(ends)].strip()
+
+        # 2. Extract from \NoteHeader to the LAST \end{document} to valid nesting
+        last_end = content.rfind(r'\end{document}', start)
         if last_end != -1:
-            return body[:last_end].strip()
-        return body.strip()
+            return content[start:last_end].strip()
+        return content[start:].strip()
 
     # 3. Fallback: \begin{document} to \end{document}
-    match = re.search(r'\\begin\{document\}(.*)', content, re.DOTALL)
-    if match:
-        body = match.group(1)
-        # Try to strip \NoteHeader if it exists but wasn't caught above
-        body = re.sub(r'\\NoteHeader', '', body, count=1)
-        
-        last_end = body.rfind(r'\end{document}')
+    begin = content.find(r'\begin{document}')
+    if begin != -1:
+        start = begin + len(r'\begin{document}')
+        last_end = content.rfind(r'\end{document}', start)
         if last_end != -1:
-            return body[:last_end].strip()
-        return body.strip()
+            return content[start:last_end].strip()
+        return content[start:].strip()
 
     return ""
 
+_NEXT_NOTE_RE = re.compile(r'\\Next(?:Note)?\{([^}]+)\}')
+_PREVIOUS_NOTE_RE = re.compile(r'\\Previous(?:Note)?\{([^}]+)\}')
+
 def extract_navigation(content):
     """Extract Next and Previous links from LaTeX content."""
     next_note = None
     prev_note = None
     
     # Matches \Next{note} or \NextNote{note}
-    match_next = re.search(r'\\Next(?:Note)?\{([^}]+)\}', content)
+    match_next = _NEXT_NOTE_RE.search(content)
     if match_next:
         next_note = match_next.group(1)
         
-    match_prev = re.search(r'\\Previous(?:Note)?\{([^}]+)\}', content)
+    match_prev = _PREVIOUS_NOTE_RE.search(content)
     if match_prev:
         prev_note = match_prev.group(1)
         
@@ -166,11 +184,24 @@ def build_title_map(notes_dir):
             title_map[name] = name  # Title matches filename exactly
     return title_map
 
+# \wref[display]{target}, with an optional trailing [display] matched separately
+_WREF_RE = re.compile(r'\\wref(?:\[([^\]]+)\])?\{([^}]+)\}')
+_WREF_DISPLAY_AFTER_RE = re.compile(r'\[([^\]]+)\]')
+
 def convert_wikilinks(text, title_map=None):
     """Convert \wref links to HTML links with title lookup."""
-    def repl(match):
-        display = match.group('display') or match.group('display_after')
-        target = match.group('target')
+    out = []
+    pos = 0
+    while True:
+        match = _WREF_RE.search(text, pos)
+        if not match:
+            break
+        display, target = match.groups()
+        end = match.end()
+        after = _WREF_DISPLAY_AFTER_RE.match(text, end)
+        if after:
+            display = display or after.group(1)
+            end = after.end()
         
         # If no display text is provided, try to look up the title
         if not display:
@@ -181,49 +212,76 @@ def convert_wikilinks(text, title_map=None):
                 # Don't force title case, just replace hyphens with spaces
                 display = target.replace('-', ' ')
                 
-        return f'<a href="{target}.html">{display}</a>'
+        out.append(text[pos:match.start()])
+        out.append(f'<a href="{target}.html">{display}</a>')
+        pos = end
+    out.append(text[pos:])
+    return ''.join(out)
 
-    pattern = re.compile(
-        r'\\wref(?:\[(?P<display>[^\]]+)\])?\{(?P<target>[^}]+)\}(?:\[(?P<display_after>[^\]]+)\])?'
-    )
-    return pattern.sub(repl, text)
+_BOLD_RE = re.compile(r'\*\*([^*]+)\*\*')
+_TEXTBF_RE = re.compile(r'\\textbf\{([^}]+)\}')
 
 def convert_bold(text):
     """Convert **bold** to <strong>bold</strong>"""
-    text = re.sub(r'\*\*([^*]+)\*\*', r'<strong>\1</strong>', text)
+    text = _BOLD_RE.sub(r'<strong>\1</strong>', text)
     return text
 
 def convert_latex_bold(text):
     """Convert \\textbf{...} to <strong>...</strong>"""
-    text = re.sub(r'\\textbf\{([^}]+)\}', r'<strong>\1</strong>', text)
+    text = _TEXTBF_RE.sub(r'<strong>\1</strong>', text)
     return text
 
 def convert_italic(text):
     """Convert *italic* to <em>italic</em>"""
-    return re.sub(r'\*(.*?)\*', r'<em>\1</em>', text)
+    # Linear scan: pair each '*' with the next one on the same line
+    result = []
+    pos = 0
+    start = text.find('*')
+    while start != -1:
+        end = text.find('*', start + 1)
+        if end == -1:
+            break
+        if text.find('\n', start + 1, end) != -1:
+            # Opening '*' has no partner on its line; try the next one
+            start = end
+            continue
+        result.append(text[pos:start])
+        result.append('<em>')
+        result.append(text[start + 1:end])
+        result.append('</em>')
+        pos = end + 1
+        start = text.find('*', pos)
+    result.append(text[pos:])
+    return ''.join(result)
+
+_EMPH_RE = re.compile(r'\\emph\{(.*?)\}')
+_TEXTIT_RE = re.compile(r'\\textit\{(.*?)\}')
 
 def convert_emph(text):
     """Convert \\emph{...} to <em>...</em>"""
-    return re.sub(r'\\emph\{(.*?)\}', r'<em>\1</em>', text)
+    return _EMPH_RE.sub(r'<em>\1</em>', text)
 
 def convert_textit(text):
     """Convert \\textit{...} to <em>...</em>"""
-    return re.sub(r'\\textit\{(.*?)\}', r'<em>\1</em>', text)
+    return _TEXTIT_RE.sub(r'<em>\1</em>', text)
+
+_QUOTES = {"``": "“", "''": "”", "`": "‘", "'": "’"}
+_QUOTES_RE = re.compile(r"``|''|`|'")
 
 def convert_quotes(text):
     """Convert ``...'' to “...” and `...' to ‘...’"""
-    text = re.sub(r"``", "“", text)
-    text = re.sub(r"''", "”", text)
-    text = re.sub(r"`", "‘", text)
-    text = re.sub(r"'", "’", text)
-    return text
+    # Doubled quotes are tried first, so one pass matches the old
+    # ``, '', `, ' sequence of replacements.
+    return _QUOTES_RE.sub(lambda m: _QUOTES[m.group(0)], text)
+
+_TEXTTT_RE = re.compile(r'\\texttt\{([^}]+)\}')
 
 def convert_texttt(text):
     """Convert \\texttt{...} to <code>...</code>"""
     # Use loop to handle nested braces or multiple occurrences robustly
     # But for texttt simple regex usually suffices if no nested braces
     # Let's use robust regex that handles one level of nesting if possible, or non-greedy
-    return re.sub(r'\\texttt\{([^}]+)\}', r'<code>\1</code>', text)
+    return _TEXTTT_RE.sub(r'<code>\1</code>', text)
 
 def convert_specialchars(text):
     """Convert LaTeX special characters like \\textbackslash"""
@@ -286,32 +344,58 @@ def convert_texorpdfstring(text, prefer_text=False):
     result = "".join(out)
     return result
 
+_COMMENT_RE = re.compile(r'(?<!\\)%.*$', re.MULTILINE)
+
 def strip_comments(text):
     """Strip LaTeX comments, handling escaped percent signs."""
     # This is complex because of lines.
     # We should iterate line by line or use a robust pattern.
     # Pattern: % followed by anything until newline, but NOT if preceded by \
-    return re.sub(r'(?<!\\)%.*$', '', text, flags=re.MULTILINE)
+    return _COMMENT_RE.sub('', text)
+
+
+# Delimiter scanners for _skip_group, keyed by opening character
+_GROUP_DELIM_RES = {
+    '{': re.compile(r'[{}]'),
+    '[': re.compile(r'[\[\]]'),
+}
+
+def _skip_group(text, pos, open_char='{'):
+    """Skip to the first open_char at or after pos and past its balanced group.
 
+    open_char is '{' or '['; the matching closer comes from _GROUP_DELIM_RES.
+
+    Returns (end_index, ok) where ok is False if no balanced group was found
+    (end_index is then pos if there was no open_char, else len(text)).
+    The regex jumps between delimiters instead of stepping through every
+    character in Python.
+    """
+    start = text.find(open_char, pos)
+    if start == -1: return pos, False
+    balance = 1
+    for match in _GROUP_DELIM_RES[open_char].finditer(text, start + 1):
+        if text[match.start()] == open_char:
+            balance += 1
+        else:
+            balance -= 1
+            if balance == 0:
+                return match.end(), True
+    return len(text), False
 
 def parse_balanced(text, start_idx):
     """Helper to parse literal balanced braces returning content inside."""
     if start_idx >= len(text) or text[start_idx] != '{':
         return "", start_idx
     
-    balance = 1
-    i = start_idx + 1
-    content_start = i
-    while i < len(text) and balance > 0:
-        if text[i] == '{': balance += 1
-        elif text[i] == '}': balance -= 1
-        i += 1
-        
-    return text[content_start:i-1], i
+    end, _ = _skip_group(text, start_idx)
+    return text[start_idx+1:end-1], end
+
+_MARKDOWN_LINK_RE = re.compile(r'\[([^\]]+)\]\(([^)]+)\)')
+_HREF_RE = re.compile(r'\\href\{([^}]+)\}\{(.*?)\}')
 
 def convert_markdown_links(text):
     """Convert [text](url) to <a href="url">text</a>"""
-    return re.sub(r'\[([^\]]+)\]\(([^)]+)\)', r'<a href="\2">\1</a>', text)
+    return _MARKDOWN_LINK_RE.sub(r'<a href="\2">\1</a>', text)
 
 def convert_href(text):
     """Convert \\href{url}{text} to <a href="url">text</a>"""
@@ -322,18 +406,43 @@ def convert_href(text):
         if url.lower().endswith('.pdf') and '#page=' not in url:
             url += "#page=1.00&gsr=0"
         return f'<a href="{url}">{label}</a>'
-        
-    pattern = r'\\href\{([^}]+)\}\{(.*?)\}'
-    return re.sub(pattern, repl, text)
+
+    return _HREF_RE.sub(repl, text)
+
+class _IdCharTable(dict):
+    """str.translate table for ID sanitizing, filled lazily per code point.
+
+    Code points for which keep(char) is true map to themselves, all others
+    to replacement (None deletes them).
+    """
+    def __init__(self, keep, replacement):
+        super().__init__()
+        self.keep = keep
+        self.replacement = replacement
+
+    def __missing__(self, code):
+        value = code if self.keep(chr(code)) else self.replacement
+        self[code] = value
+        return value
+
+def _is_ascii_alnum(char):
+    return char.isascii() and char.isalnum()
+
+# Same character classes as [^a-zA-Z0-9\-_] -> '-' and [^a-zA-Z0-9\s-] -> ''
+_LABEL_ID_TABLE = _IdCharTable(lambda c: _is_ascii_alnum(c) or c in '-_', '-')
+_HEADER_ID_TABLE = _IdCharTable(lambda c: _is_ascii_alnum(c) or c.isspace() or c == '-', None)
+_HTML_TAG_RE = re.compile(r'<[^>]+>')
+_LATEX_COMMAND_RE = re.compile(r'\\[a-zA-Z]+')
+_LABEL_RE = re.compile(r'\\label\{([^}]+)\}')
 
 def convert_labels(text):
     """Convert \\label{foo} to <a id="foo"></a>, sanitizing the ID."""
     def repl(match):
         label = match.group(1)
-        safe_id = re.sub(r'[^a-zA-Z0-9\-_]', '-', label)
+        safe_id = label.translate(_LABEL_ID_TABLE)
         return f'<a id="{safe_id}" class="latex-label"></a>'
         
-    return re.sub(r'\\label\{([^}]+)\}', repl, text)
+    return _LABEL_RE.sub(repl, text)
 
 def replace_command_robust(text, cmd_name, repl_template):
     """
@@ -375,131 +484,176 @@ def replace_command_robust(text, cmd_name, repl_template):
 
 
 
+_REF_RE = re.compile(r'\\(cref|ref|eqref)\{([^}]+)\}')
+
 def convert_refs(text):
     """Convert \\ref, \\cref, \\eqref to HTML links"""
     def sanitize(label):
-         return re.sub(r'[^a-zA-Z0-9\-_]', '-', label)
+         return label.translate(_LABEL_ID_TABLE)
 
-    # \cref{label}
-    def repl_cref(match):
-        label = match.group(1)
-        safe_id = sanitize(label)
-        # simplistic display: just the label or "Reference"
-        # Ideally we'd know the counter, but we don't.
-        # Use the label ID itself as text for now.
-        return f'<a href="#{safe_id}" class="latex-ref">{label}</a>'
-
-    # \ref{label}
-    def repl_ref(match):
-        label = match.group(1)
+    # \cref{label} and \ref{label} -> label, \eqref{label} -> (label)
+    # Ideally we'd know the counter, but we don't.
+    # Use the label ID itself as text for now.
+    def repl(match):
+        label = match.group(2)
         safe_id = sanitize(label)
-        return f'<a href="#{safe_id}" class="latex-ref">{label}</a>'
+        link = f'<a href="#{safe_id}" class="latex-ref">{label}</a>'
+        if match.group(1) == 'eqref':
+            return f'({link})'
+        return link
+
+    return _REF_RE.sub(repl, text)
+
+# Start of any TikZ construct handled by convert_tikz; the last group names the kind
+_TIKZ_START_RE = re.compile(
+    r'(```tikz|\\begin\{tkz\}|\\tz|\\verb|\\begin\{verbatim\}|\\begin\{lstlisting\})'
+    r'|(?:\\\[\s*)?(\\begin\{tikzcd\})|(\\begin\{tikzpicture\})'
+)
+_TIKZ_MARKERS = ('```tikz', '\\begin{tkz}', '\\begin{tikz', '\\tz')
+_TIKZPICTURE_FMT = '\\begin{{tikzpicture}}\n{}\n\\end{{tikzpicture}}'
+_TIKZPICTURE_OPT_FMT = '\\begin{{tikzpicture}}[{}]\n{}\n\\end{{tikzpicture}}'
+
+def _tikzpicture_code(opt, content):
+    """Build a tikzpicture environment, with [opt] only if opt is non-empty."""
+    if opt:
+        return _TIKZPICTURE_OPT_FMT.format(opt, content)
+    return _TIKZPICTURE_FMT.format(content)
+
+_VERB_RE = re.compile(r'\\verb(?P<delim>[^a-zA-Z]).*?(?P=delim)', re.DOTALL)
+_VERBATIM_ENV_RE = re.compile(r'\\begin\{verbatim\}.*?\\end\{verbatim\}', re.DOTALL)
+_LSTLISTING_ENV_RE = re.compile(r'\\begin\{lstlisting\}.*?\\end\{lstlisting\}', re.DOTALL)
+# Surrounding whitespace is stripped in Python: '\s*(.*?)\s*```' backtracks
+# cubically over a long whitespace run in an unterminated block
+_TIKZ_FENCED_RE = re.compile(r'```tikz(.*?)```', re.DOTALL)
+_TKZ_ENV_RE = re.compile(r'\\begin\{tkz\}(?:\[([^\]]*)\])?(.*?)\\end\{tkz\}', re.DOTALL)
+_TIKZCD_ENV_RE = re.compile(r'(?:\\\[\s*)?(\\begin\{tikzcd\}.*?\\end\{tikzcd\})(?:\s*\\\])?', re.DOTALL)
+_TIKZPICTURE_ENV_RE = re.compile(r'\\begin\{tikzpicture\}(?:\[([^\]]*)\])?(.*?)\\end\{tikzpicture\}', re.DOTALL)
+
+def restore_placeholders(pattern, blocks, text, nested=False):
+    """Substitute stashed blocks back for their numbered placeholders in one pass.
+
+    Placeholders whose index is out of range are left untouched. With
+    nested=True, placeholders inside a restored block are restored as well;
+    blocks are stashed in order, so a block only nests lower indices.
+    """
+    if not blocks:
+        return text
 
-    # \eqref{label} -> (ref)
-    def repl_eqref(match):
-        label = match.group(1)
-        safe_id = sanitize(label)
-        return f'(<a href="#{safe_id}" class="latex-ref">{label}</a>)'
+    def restore(segment, limit):
+        def repl(match):
+            i = int(match.group(1))
+            if i >= limit:
+                return match.group(0)
+            return restore(blocks[i], i) if nested else blocks[i]
+        return pattern.sub(repl, segment)
 
-    text = re.sub(r'\\cref\{([^}]+)\}', repl_cref, text)
-    text = re.sub(r'\\ref\{([^}]+)\}', repl_ref, text)
-    text = re.sub(r'\\eqref\{([^}]+)\}', repl_eqref, text)
-    return text
+    return restore(text, len(blocks))
 
 def convert_tikz(text, extra_preamble=""):
     """Convert tikz code blocks, inline tikzcd, tkz environment, and \tz command to TikZJax."""
-    
-    # helper to stash content to protect from regexes
-    verb_blocks = []
-    def stash_verb(match):
-        verb_blocks.append(match.group(0))
-        return f'__VERB_BLOCK_{len(verb_blocks) - 1}__'
-    
-    # Stash \verb|...|
-
-    # Stash \verb|...|
-    text = re.sub(r'\\verb(?P<delim>[^a-zA-Z]).*?(?P=delim)', stash_verb, text, flags=re.DOTALL)
-    # Stash \begin{verbatim}...\end{verbatim}
-    text = re.sub(r'\\begin\{verbatim\}.*?\\end\{verbatim\}', stash_verb, text, flags=re.DOTALL)
-    # Stash \begin{lstlisting}...\end{lstlisting}
-    text = re.sub(r'\\begin\{lstlisting\}.*?\\end\{lstlisting\}', stash_verb, text, flags=re.DOTALL)
+    if not any(marker in text for marker in _TIKZ_MARKERS):
+        return text
 
-    tikz_blocks = []
-    def stash_script(script_content):
-        tikz_blocks.append(script_content)
-        return f'__TIKZ_BLOCK_{len(tikz_blocks) - 1}__'
+    # Script-tag opening plus preamble, built once per call on first use
+    prefix = None
 
     # Helper to wrap content in script tag with preamble
-    def wrap_tikz(content, preamble=True, extra_preamble=""):
-        full_content = (TIKZ_PREAMBLE + "\n" + extra_preamble + "\n" + content) if preamble else content
-        return f'<script type="text/tikz">{full_content}</script>'
+    def wrap_tikz(content, preamble=True):
+        nonlocal prefix
+        if preamble:
+            if prefix is None:
+                prefix = '<script type="text/tikz">' + get_tikz_preamble() + "\n" + extra_preamble + "\n"
+            return prefix + content + '</script>'
+        return f'<script type="text/tikz">{content}</script>'
 
     # 1. Handle ```tikz ... ``` blocks
     def repl_block(match):
-        content = match.group(1)
-        return stash_script(wrap_tikz(content, extra_preamble=extra_preamble))
-    
-    text = re.sub(r'```tikz\s*(.*?)\s*```', repl_block, text, flags=re.DOTALL)
+        content = match.group(1).strip()
+        return wrap_tikz(content)
 
     # 2. Handle \begin{tkz}[opt] ... \end{tkz}
     def repl_tkz(match):
         opt = match.group(1) if match.group(1) else ""
         content = match.group(2)
         # Reconstruct the full tikzpicture code
-        if opt:
-            tikz_code = f'\\begin{{tikzpicture}}[{opt}]\n{content}\n\\end{{tikzpicture}}'
-        else:
-            tikz_code = f'\\begin{{tikzpicture}}\n{content}\n\\end{{tikzpicture}}'
-        return stash_script(wrap_tikz(tikz_code, extra_preamble=extra_preamble))
+        tikz_code = _tikzpicture_code(opt, content)
+        return wrap_tikz(tikz_code)
 
-    text = re.sub(r'\\begin\{tkz\}(?:\[([^\]]*)\])?(.*?)\\end\{tkz\}', repl_tkz, text, flags=re.DOTALL)
+    # 4. Handle \begin{tikzcd} ... \end{tikzcd}
+    # Matches optional \[ wrapper, then the environment
+    def repl_tikzcd(match):
+        content = match.group(1)
+        return wrap_tikz(content)
 
-    text = re.sub(r'\\begin\{tkz\}(?:\[([^\]]*)\])?(.*?)\\end\{tkz\}', repl_tkz, text, flags=re.DOTALL)
+    # 5. Handle \begin{tikzpicture}[opt] ... \end{tikzpicture}
+    def repl_tikzpicture(match):
+        opt = match.group(1) if match.group(1) else ""
+        content = match.group(2)
+        # Reconstruct the full tikzpicture code
+        tikz_code = _tikzpicture_code(opt, content)
+        return wrap_tikz(tikz_code, preamble=False)
+
+    # \verb|...|, verbatim and lstlisting are copied through untouched
+    def keep_verbatim(match):
+        return match.group(0)
+
+    env_handlers = {
+        r'\verb': (_VERB_RE, keep_verbatim),
+        r'\begin{verbatim}': (_VERBATIM_ENV_RE, keep_verbatim),
+        r'\begin{lstlisting}': (_LSTLISTING_ENV_RE, keep_verbatim),
+        '```tikz': (_TIKZ_FENCED_RE, repl_block),
+        r'\begin{tkz}': (_TKZ_ENV_RE, repl_tkz),
+        r'\begin{tikzcd}': (_TIKZCD_ENV_RE, repl_tikzcd),
+        r'\begin{tikzpicture}': (_TIKZPICTURE_ENV_RE, repl_tikzpicture),
+    }
 
-    # 3. Handle \tz[opt]{content} - Manual scan for nested braces
+    # Single left-to-right pass: find the next construct of any kind and
+    # convert it in place, so converted output is never rescanned. Verbatim
+    # spans are skipped the same way, so they need no stash/restore.
     out_text = []
     idx = 0
     n = len(text)
-    while idx < n:
-        # Find next \tz
-        next_tz = text.find(r'\tz', idx)
-        if next_tz == -1:
+    while True:
+        start_match = _TIKZ_START_RE.search(text, idx)
+        if not start_match:
             out_text.append(text[idx:])
             break
-            
-        # Append text before \tz
-        out_text.append(text[idx:next_tz])
-        
-        # Check if valid command start
-        # \tz followed by [ or { or space?
-        cursor = next_tz + 3 # len(\tz)
-        
-        # Save start pos to revert if no match
-        match_start = next_tz
-        
+
+        start = start_match.start()
+        out_text.append(text[idx:start])
+        token = start_match.group(start_match.lastindex)
+
+        if token != r'\tz':
+            pattern, repl = env_handlers[token]
+            env_match = pattern.match(text, start)
+            if env_match:
+                out_text.append(repl(env_match))
+                idx = env_match.end()
+            else:
+                # Unterminated environment, leave it as text
+                out_text.append(text[start])
+                idx = start + 1
+            continue
+
+        # 3. Handle \tz[opt]{content} - Manual scan for nested braces
+        cursor = start + 3 # len(\tz)
+
         # Skip spaces
         while cursor < n and text[cursor].isspace():
             cursor += 1
             
         # Optional arg
         opt = ""
-        has_opt = False
         if cursor < n and text[cursor] == '[':
             # Consume balanced [...]
             opt_start = cursor + 1
-            balance = 1
-            cursor += 1
-            while cursor < n and balance > 0:
-                if text[cursor] == '[': balance += 1
-                elif text[cursor] == ']': balance -= 1
-                cursor += 1
-            if balance == 0:
+            cursor, ok = _skip_group(text, cursor, '[')
+            if ok:
                 opt = text[opt_start:cursor-1]
-                has_opt = True
             else:
-                # Open bracket but no close? Abort
-                out_text.append(text[match_start:cursor])
-                idx = cursor
+                # Open bracket but no close? Abort, keep scanning after it
+                out_text.append(text[start:opt_start])
+                idx = opt_start
                 continue
 
         # Skip spaces
@@ -510,73 +664,44 @@ def convert_tikz(text, extra_preamble=""):
         if cursor < n and text[cursor] == '{':
             # Consume balanced {...}
             body_start = cursor + 1
-            balance = 1
-            cursor += 1
-            while cursor < n and balance > 0:
-                if text[cursor] == '{': balance += 1
-                elif text[cursor] == '}': balance -= 1
-                cursor += 1
-                
-            if balance == 0:
+            cursor, ok = _skip_group(text, cursor)
+            if ok:
                 body = text[body_start:cursor-1]
                 # Found it!
-                tikz_code = f'\\begin{{tikzpicture}}[{opt}]\n{body}\n\\end{{tikzpicture}}'
-                replacement = stash_script(wrap_tikz(tikz_code, extra_preamble=extra_preamble))
-                out_text.append(replacement)
-                idx = cursor
-                continue
-            else:
-                # Unbalanced
-                out_text.append(text[match_start:cursor])
+                tikz_code = _TIKZPICTURE_OPT_FMT.format(opt, body)
+                out_text.append(wrap_tikz(tikz_code))
                 idx = cursor
                 continue
-                
+            # Unbalanced, keep scanning after the brace
+            cursor = body_start
+
         # If we get here, it wasn't a valid \tz call (e.g. \tzsomething)
-        # But wait, \tz could be just \tz without args? Uncommon for this macro.
-        # Check if character after \tz is non-alpha?
-        # But we already skipped spaces.
-        # If it's `\tz ` (space) or `\tz{`, we proceed.
-        # Only if we failed to match { after optional args.
-        
-        # Just append what we skipped and continue
-        out_text.append(text[match_start:cursor])
+        # or the braces were unbalanced. Just append what we skipped.
+        out_text.append(text[start:cursor])
         idx = cursor
         
-    text = "".join(out_text)
-
-    # 4. Handle \begin{tikzcd} ... \end{tikzcd}
-    # Matches optional \[ wrapper, then the environment
-    def repl_tikzcd(match):
-        content = match.group(1)
-        # Verify content starts with \begin{tikzcd} to be safe, though regex ensures it
-        return stash_script(wrap_tikz(content, extra_preamble=extra_preamble))
-
-    text = re.sub(r'(?:\\\[\s*)?(\\begin\{tikzcd\}.*?\\end\{tikzcd\})(?:\s*\\\])?', repl_tikzcd, text, flags=re.DOTALL)
-
-    # 5. Handle \begin{tikzpicture}[opt] ... \end{tikzpicture}
-    def repl_tikzpicture(match):
-        opt = match.group(1) if match.group(1) else ""
-        content = match.group(2)
-        # Reconstruct the full tikzpicture code
-        if opt:
-            tikz_code = f'\\begin{{tikzpicture}}[{opt}]\n{content}\n\\end{{tikzpicture}}'
-        else:
-            tikz_code = f'\\begin{{tikzpicture}}\n{content}\n\\end{{tikzpicture}}'
-        return stash_script(wrap_tikz(tikz_code, preamble=False, extra_preamble=extra_preamble))
-
-    text = re.sub(r'\\begin\{tikzpicture\}(?:\[([^\]]*)\])?(.*?)\\end\{tikzpicture\}', repl_tikzpicture, text, flags=re.DOTALL)
-    
-    # Restore TikZ blocks
-    for i, block in enumerate(tikz_blocks):
-        text = text.replace(f'__TIKZ_BLOCK_{i}__', block)
-    # Restore verb blocks
-    for i, block in enumerate(verb_blocks):
-        text = text.replace(f'__VERB_BLOCK_{i}__', block)
+    return "".join(out_text)
 
-    return text
+_RESTATABLE_RE = re.compile(
+    r'\\begin\{restatable\}\{([^}]+)\}\{([^}]+)\}(.*?)\\end\{restatable\}', re.DOTALL
+)
+_THEOREM_ENVS = [
+    "definition", "theorem", "lemma", "proposition", "corollary", "example", "remark", "idea",
+    "construction", "claim", "step", "question", "warning", "exercise", "fact", "observation",
+    "convention", "note", "notation", "axiom", "assumption", "algorithm", "postulate", "proof",
+    "theoremalpha"
+]
+_THEOREM_ENV_RE = re.compile(
+    r'\\begin\{(' + "|".join([f"(?:framed)?{e}" for e in _THEOREM_ENVS]) + r')\}(?:\[([^\]]+)\])?(.*?)\\end\{\1\}',
+    re.DOTALL
+)
 
 def convert_environments(text):
     """Convert LaTeX environments to HTML divs"""
+    # Every rewrite below needs a \begin{...} (or a stray \end{pf})
+    if '\\begin{' not in text and '\\end{pf}' not in text:
+        return text
+
     # Pattern to match \begin{envname}[optional] ... \end{envname}
     def replace_env(match):
         env_name = match.group(1)
@@ -638,31 +763,14 @@ def convert_environments(text):
     # Pre-process restatable: \begin{restatable}{env}{name} ... \end{restatable} -> \begin{env} ... \end{env}
     # We ignore the name for now as the inner env usually handles labeling content or we just don't need it.
     # Note: Regex needs to match balanced braces ideally, but for simple env names {theorem} it's fine.
-    text = re.sub(
-        r'\\begin\{restatable\}\{([^}]+)\}\{([^}]+)\}(.*?)\\end\{restatable\}',
-        r'\\begin{\1}\3\\end{\1}',
-        text,
-        flags=re.DOTALL
-    )
+    if '\\begin{restatable}' in text:
+        text = _RESTATABLE_RE.sub(r'\\begin{\1}\3\\end{\1}', text)
 
     # Pre-process pf -> proof
-    text = re.sub(r'\\begin\{pf\}', r'\\begin{proof}', text)
-    text = re.sub(r'\\end\{pf\}', r'\\end{proof}', text)
-
-    envs = [
-        "definition", "theorem", "lemma", "proposition", "corollary", "example", "remark", "idea",
-        "construction", "claim", "step", "question", "warning", "exercise", "fact", "observation",
-        "convention", "note", "notation", "axiom", "assumption", "algorithm", "postulate", "proof",
-        "theoremalpha"
-    ]
-    formatted_envs = "|".join([f"(?:framed)?{e}" for e in envs])
-    
-    text = re.sub(
-        r'\\begin\{(' + formatted_envs + r')\}(?:\[([^\]]+)\])?(.*?)\\end\{\1\}',
-        replace_env,
-        text,
-        flags=re.DOTALL
-    )
+    text = text.replace('\\begin{pf}', '\\begin{proof}')
+    text = text.replace('\\end{pf}', '\\end{proof}')
+
+    text = _THEOREM_ENV_RE.sub(replace_env, text)
 
     return text
 
@@ -740,183 +848,146 @@ SAFE_ON_LAYER = r'''
 
 def strip_command(text, cmd):
     """Strip a command and its balanced arguments from latex text."""
-    # Find command
+    # Number of mandatory brace groups for the known tz.sty targets:
+    # \NewDocumentCommand{name}{args}{body} -> 3
+    # \NewDocumentEnvironment{name}{args}{begin}{end} -> 4
+    # \tikzdeclarepattern{...} -> 1
+    groups_to_remove = 1
+    if 'NewDocumentCommand' in cmd: groups_to_remove = 3
+    if 'NewDocumentEnvironment' in cmd: groups_to_remove = 4
+    if 'tikzdeclarepattern' in cmd: groups_to_remove = 1
+
+    # Single left-to-right scan: copy the text between hits and jump over
+    # each command together with its argument groups.
+    out = []
+    pos = 0
     while True:
-        idx = text.find(cmd)
+        idx = text.find(cmd, pos)
         if idx == -1:
+            out.append(text[pos:])
             break
-            
-        # Check if it is the command (not suffix)
-        # simplistic check: followed by { or [ or space
-        # But we assume inputs like \tikzdeclarepattern{...}
-        
-        # Find start of arguments (first { or [)
-        # We assume standard latex: \cmd{arg} or \cmd[opt]{arg}
-        # For our targets, they are \NewDocumentCommand... or \tikzdeclarepattern...
-        
-        # We just want to effectively remove the whole block.
-        # Simple brace counting from the first {.
-        
-        pre = text[:idx]
-        post = text[idx+len(cmd):]
-        
-        # Scan forward in post to find first {
-        open_idx = post.find('{')
-        if open_idx == -1:
-             # Weird, just remove command?
-             text = pre + post
-             continue
-             
-        # Just remove whitespace between cmd and first {
-        # Actually NewDocumentCommand has args like {name}, so it's fine.
-        
-        # Balance braces starting from open_idx
-        balance = 1
-        pos = open_idx + 1
-        while pos < len(post) and balance > 0:
-            if post[pos] == '{':
-                balance += 1
-            elif post[pos] == '}':
-                balance -= 1
-            pos += 1
-            
-        if balance == 0:
-            # Found end
-            # Also check if there are subsequent arguments?
-            # For \NewDocumentCommand{\tz}{...}{...}, there are 3 brace groups!
-            # For \tikzdeclarepattern{...}, there is 1.
-            
-            # Simple heuristic: consume trailing spaces and look for another { immediately?
-            # For this specific task, we know:
-            # \tikzdeclarepattern{...} -> 1 group
-            # \NewDocumentCommand{name}{args}{body} -> 3 groups
-            # \NewDocumentEnvironment{name}{args}{begin}{end} -> 4 groups
-            
-            # Let's just remove the first group for pattern, and assume we handle others by name.
-            
-            # To be robust, let's hardcode for the known commands.
-            pass
-            
-        # REWRITE: simpler loop
-        # We need to handle multiple distinct commands.
-        # Let's just regex matching the command name, then consume N mandatory args?
-        # Too complex.
-        
-        # Fallback: Just replace the specific known strings from tz.sty?
-        # No, that's brittle.
-        
-        # Recursive brace stripper implementation:
-        
-        def consume_brace_group(s):
-            start = s.find('{')
-            if start == -1: return 0, False
-            balance = 1
-            i = start + 1
-            while i < len(s) and balance > 0:
-                if s[i] == '{': balance += 1
-                elif s[i] == '}': balance -= 1
-                i += 1
-            return i, (balance == 0)
-            
-        # Logic for removal
-        current_post = post
-        groups_to_remove = 1
-        if 'NewDocumentCommand' in cmd: groups_to_remove = 3
-        if 'NewDocumentEnvironment' in cmd: groups_to_remove = 4
-        if 'tikzdeclarepattern' in cmd: groups_to_remove = 1
-        
-        total_consumed = 0
+
+        out.append(text[pos:idx])
+        cur = idx + len(cmd)
+
+        if text.find('{', cur) == -1:
+            # Weird, just remove command
+            pos = cur
+            continue
+
         success = True
-        
         for _ in range(groups_to_remove):
-             length, ok = consume_brace_group(current_post)
-             if not ok:
-                 success = False
-                 break
-             total_consumed += length
-             current_post = current_post[length:]
-             
-        if success:
-            text = pre + current_post
-        else:
-             # Failed to match, abort stripping this instance
-             if 'NewDocumentCommand' in cmd:
-                 # Backup plan: regex replace the command itself and hopefully braces balance out later or don't matter?
-                 # No, that's dangerous.
-                 # Let's just try to be more robust.
-                 # If we can't strip it, maybe we just replace the command name with empty?
-                 # text = pre + post # NO - leaves args
-                 break
-             break
-             
-    return text
+            cur, ok = _skip_group(text, cur)
+            if not ok:
+                success = False
+                break
 
-def consume_group(s, open_char='{', close_char='}'):
-    start = s.find(open_char)
-    if start == -1: return 0, False
-    balance = 1
-    i = start + 1
-    while i < len(s) and balance > 0:
-        if s[i] == open_char: balance += 1
-        elif s[i] == close_char: balance -= 1
-        i += 1
-    return i, (balance == 0)
+        if not success:
+            # Failed to match, keep this instance and everything after it
+            out.append(text[idx:])
+            break
+        pos = cur
+
+    return ''.join(out)
+
+_WHITESPACE_RE = re.compile(r'\s*')
 
 def remove_newcommand(text, cmd_name):
     """Remove a specific \\newcommand definition from text."""
     escaped_cmd = re.escape(cmd_name)
-    
+    # Find \\newcommand followed by {cmd_name} or cmd_name
+    pattern = re.compile(r'\\newcommand\s*(?:\{' + escaped_cmd + r'\}|' + escaped_cmd + r'(?![a-zA-Z]))')
+
+    # Collect the kept spans and join once instead of rebuilding text per hit
+    out = []
+    pos = 0
     while True:
-        # Find \\newcommand followed by {cmd_name} or cmd_name
-        match = re.search(r'\\newcommand\s*(?:\{' + escaped_cmd + r'\}|' + escaped_cmd + r'(?![a-zA-Z]))', text)
+        match = pattern.search(text, pos)
         if not match:
+            out.append(text[pos:])
             break
             
         start_idx = match.start()
         end_idx = match.end()
         
-        current_pos = end_idx
         # Consume whitespace
-        while current_pos < len(text) and text[current_pos].isspace():
-            current_pos += 1
+        current_pos = _WHITESPACE_RE.match(text, end_idx).end()
             
         # Optional args (up to 2) - usually [n] and [default]
         for _ in range(2):
-            if current_pos < len(text) and text[current_pos] == '[':
-                 length, ok = consume_group(text[current_pos:], '[', ']')
+            if text.startswith('[', current_pos):
+                 end, ok = _skip_group(text, current_pos, '[')
                  if ok: 
-                     current_pos += length
+                     current_pos = end
                  else:
                      break
             # Consume whitespace
-            while current_pos < len(text) and text[current_pos].isspace():
-                current_pos += 1
+            current_pos = _WHITESPACE_RE.match(text, current_pos).end()
 
         # Mandatory arg (body)
-        if current_pos < len(text) and text[current_pos] == '{':
-             length, ok = consume_group(text[current_pos:], '{', '}')
-             if ok: current_pos += length
+        if text.startswith('{', current_pos):
+             end, ok = _skip_group(text, current_pos)
+             if ok: current_pos = end
              
         # Remove the whole block
-        text = text[:start_idx] + text[current_pos:]
+        out.append(text[pos:start_idx])
+        pos = current_pos
         
-    return text
+    return ''.join(out)
+
+def _tz_cache_header(tz_path):
+    """Cache key line for the cleaned tz.sty: stat of tz.sty and of this script."""
+    tz_stat = tz_path.stat()
+    script_stat = os.stat(__file__)
+    key = (tz_stat.st_mtime_ns, tz_stat.st_size, script_stat.st_mtime_ns, script_stat.st_size)
+    return f"# {key}\n"
+
+def _read_tz_cache(cache_path, header):
+    """Return the cached preamble if its header matches, else None."""
+    try:
+        with open(cache_path, 'r', encoding='utf-8', newline='') as f:
+            if f.readline() != header:
+                return None
+            return f.read()
+    except OSError:
+        return None
+
+def _write_tz_cache(cache_path, header, preamble):
+    """Write the cached preamble atomically; failures are ignored."""
+    tmp_path = cache_path.with_name(f"{cache_path.name}.{os.getpid()}.tmp")
+    try:
+        with open(tmp_path, 'w', encoding='utf-8', newline='') as f:
+            f.write(header + preamble)
+        os.replace(tmp_path, cache_path)
+    except OSError:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
 
 def load_tz_sty():
-    """Load and clean lib/tz.sty for injection into TikZJax"""
+    """Load and clean lib/tz.sty for injection into TikZJax
+
+    The cleaned result is cached in lib/.tz.sty.cache, keyed by the mtime and
+    size of tz.sty and of this script.
+    """
     try:
         root_dir = Path(__file__).resolve().parent.parent
         tz_path = root_dir / "lib" / "tz.sty"
         if not tz_path.exists():
             return ""
+
+        cache_path = tz_path.with_name(".tz.sty.cache")
+        header = _tz_cache_header(tz_path)
+        cached = _read_tz_cache(cache_path, header)
+        if cached is not None:
+            return cached
         
         with open(tz_path, 'r') as f:
             content = f.read()
             
         # Clean content
-        content = re.sub(r'\\NeedsTeXFormat.*', '', content)
-        content = re.sub(r'\\ProvidesPackage.*', '', content)
-        content = re.sub(r'\\RequirePackage.*', '', content)
+        content = _TZ_PACKAGE_LINE_RE.sub('', content)
         
         # Strip using brace matching
         content = strip_command(content, r'\NewDocumentCommand')
@@ -924,11 +995,11 @@ def load_tz_sty():
         content = strip_command(content, r'\tikzdeclarepattern')
         
         # Remove leftover specific xparse stuff
-        content = re.sub(r'\\IfValueT', '', content) # Crude but likely sufficient if args are just braces
+        content = content.replace(r'\IfValueT', '') # Crude but likely sufficient if args are just braces
         
         
         # Libraries
-        content = re.sub(r'\\usetikzlibrary\{.*?\}', '', content, flags=re.DOTALL)
+        content = _USETIKZLIBRARY_RE.sub('', content)
         # content = re.sub(r'\\pgfdeclarelayer\{.*?\}', '', content)
         # content = re.sub(r'\\pgfsetlayers\{.*?\}', '', content)
         
@@ -943,12 +1014,11 @@ def load_tz_sty():
         # 2. Remove unsafe layer configuration if present (pgfdeclarelayer etc)
         # Use simple recursive braced stripper for these too just to be safe?
         # Or just robust regex
-        content = re.sub(r'\\pgfdeclarelayer\s*\{.*?\}', '', content)
-        content = re.sub(r'\\pgfsetlayers\s*\{.*?\}', '', content)
+        content = _PGF_LAYERS_RE.sub('', content)
         
         # 3. Strip makeatletter blocks (handles on layer, pgfaddtoshape, etc)
         # This removes unsafe internals
-        content = re.sub(r'\\makeatletter.*?\\makeatother', '', content, flags=re.DOTALL)
+        content = _MAKEATLETTER_RE.sub('', content)
         
         # 4. Strip commands that we replace with legacy versions to prevent "Command already defined" errors
         # List: \mk, \ob, \wob, \umark, \labmark, \labob, \cpn, \blt
@@ -961,18 +1031,24 @@ def load_tz_sty():
         content = remove_newcommand(content, r'\cpn')
         content = remove_newcommand(content, r'\blt')
         
-        # Also clean empty lines left behind
-        content = re.sub(r'\n\s*\n', '\n', content)
+        # Also clean empty lines left behind (the first and last line are
+        # kept as-is, matching a collapse of \n\s*\n runs into \n)
+        lines = content.split('\n')
+        if len(lines) > 2:
+            kept = [line for line in lines[1:-1] if line.strip()]
+            content = '\n'.join([lines[0], *kept, lines[-1]])
 
         # 6. Remove \endinput
-        content = re.sub(r'\\endinput', '', content)
+        content = content.replace(r'\endinput', '')
 
 
         # 5. Explicitly remove on layer style definition if it wasn't stripped so we can override it
         #    It's usually: \tikzset{ on layer/.code={...} }
         #    But it might be complex. SAFE_ON_LAYER will be appended after, so it should override.
 
-        return content + "\n" + SAFE_LIBRARIES + "\n" + SAFE_ON_LAYER + "\n" + LEGACY_PATTERNS + "\n" + LEGACY_COMMANDS
+        preamble = content + "\n" + SAFE_LIBRARIES + "\n" + SAFE_ON_LAYER + "\n" + LEGACY_PATTERNS + "\n" + LEGACY_COMMANDS
+        _write_tz_cache(cache_path, header, preamble)
+        return preamble
         
     except Exception as e:
         print(f"Warning: Could not load tz.sty: {e}")
@@ -983,20 +1059,40 @@ def load_tz_sty():
 # shapes.misc, shapes.symbols, shapes.multipart are often problematic.
 SAFE_LIBRARIES = r'\usetikzlibrary{arrows.meta,calc,decorations.markings,shapes.geometric,patterns,positioning,fit}'
 
-TIKZ_PREAMBLE = r'''
+# tz.sty lines and blocks that the TikZJax preamble cannot use
+_TZ_PACKAGE_LINE_RE = re.compile(r'\\(?:NeedsTeXFormat|ProvidesPackage|RequirePackage).*')
+_USETIKZLIBRARY_RE = re.compile(r'\\usetikzlibrary\{.*?\}', re.DOTALL)
+_PGF_LAYERS_RE = re.compile(r'\\(?:pgfdeclarelayer|pgfsetlayers)\s*\{.*?\}')
+_MAKEATLETTER_RE = re.compile(r'\\makeatletter.*?\\makeatother', re.DOTALL)
+
+@functools.lru_cache(maxsize=1)
+def get_tikz_preamble():
+    """Return the TikZJax preamble, loading tz.sty on first use only."""
+    return r'''
 ''' + load_tz_sty() + r'''
 
 \newcommand{\wref}[2][]{#2}
 '''
 
+_ITEM_SPLIT_RE = re.compile(r'\s*\\item\s+')
+_LST_ENV_RE = re.compile(r'\\begin\{lst\}(?:\[(.*?)\])?(.*?)\\end\{lst\}', re.DOTALL)
+_ITEMIZE_ENV_RE = re.compile(r'\\begin\{itemize\}(?:\[(.*?)\])?(.*?)\\end\{itemize\}', re.DOTALL)
+_ENUMERATE_ENV_RE = re.compile(r'\\begin\{enumerate\}(?:\[(.*?)\])?(.*?)\\end\{enumerate\}', re.DOTALL)
+
+def render_list_items(items):
+    """Render items as <li> lines, joined once instead of appended with +=."""
+    return "".join([f"<li>{item}</li>\n" for item in items])
+
 def convert_lst(text):
     """Convert LaTeX lst environment to HTML lists"""
+    if '\\begin{' not in text:
+        return text
 
     def replace_lst(match):
         optional = match.group(1) if match.group(1) else ""
         content = match.group(2)
         # Split by \item
-        items = re.split(r'\s*\\item\s+', content)
+        items = _ITEM_SPLIT_RE.split(content)
         # Filter empty items
         items = [item.strip() for item in items if item.strip()]
         
@@ -1004,24 +1100,18 @@ def convert_lst(text):
         # If label is present (e.g. H*1), maybe we should preserve it?
         # But simpler to just make a list.
         # If optional has label, maybe we could surface it, but <ul> is safe.
-        list_html = "<ul>\n"
-        
         # If there's a custom label, regular <ul> won't show it.
         # This function generates standard bullets.
         # For now, this fixes the "artifacts" issue.
-        
-        for item in items:
-            list_html += f"<li>{item}</li>\n"
-        list_html += "</ul>"
-        return list_html
+        return f"<ul>\n{render_list_items(items)}</ul>"
 
-    text = re.sub(r'\\begin\{lst\}(?:\[(.*?)\])?(.*?)\\end\{lst\}', replace_lst, text, flags=re.DOTALL)
+    text = _LST_ENV_RE.sub(replace_lst, text)
     
     # Also handle standard itemize/enumerate
     def replace_itemize(match):
         optional = match.group(1) if match.group(1) else ""
         content = match.group(2)
-        items = re.split(r'\s*\\item\s+', content)
+        items = _ITEM_SPLIT_RE.split(content)
         items = [item.strip() for item in items if item.strip()]
         
         # Check for nosep
@@ -1029,135 +1119,130 @@ def convert_lst(text):
         if "nosep" in optional:
             css_class = ' class="nosep"'
             
-        list_html = f"\n<ul{css_class}>\n"
-        for item in items:
-            list_html += f"<li>{item}</li>\n"
-        list_html += "</ul>\n"
-        return list_html
+        return f"\n<ul{css_class}>\n{render_list_items(items)}</ul>\n"
         
-    text = re.sub(r'\\begin\{itemize\}(?:\[(.*?)\])?(.*?)\\end\{itemize\}', replace_itemize, text, flags=re.DOTALL)
-    text = re.sub(r'\\begin\{enumerate\}(?:\[(.*?)\])?(.*?)\\end\{enumerate\}', replace_itemize, text, flags=re.DOTALL)
+    text = _ITEMIZE_ENV_RE.sub(replace_itemize, text)
+    text = _ENUMERATE_ENV_RE.sub(replace_itemize, text)
 
     return text
 
+# A line that starts a markdown list item ("- foo", "* foo", "- (i) foo")
+_LIST_ITEM_LINE_RE = re.compile(r'^[^\S\n]*[-*][^\S\n]', re.MULTILINE)
+# One match per line: "- (label) text" fills groups 2-3 (ordered), any other
+# item fills group 4 (unordered), so lastindex points at the content
+_LIST_ITEM_RE = re.compile(
+    r'^(\s*)(?:-|\*)\s+(?:\(([ivxIVX0-9]+)\)\s+(.*)|(?!\([ivxIVX0-9]+\)\s)(.*))$'
+)
+
 def convert_itemize(text):
     """Convert list items to proper HTML lists"""
-    lines = text.split('\n')
+    # Text between lists is copied through in bulk; only the lines of each
+    # list block are walked one at a time.
     result = []
-    in_list = False
+    pos = 0
+    n = len(text)
+    while pos <= n:
+        match = _LIST_ITEM_LINE_RE.search(text, pos)
+        if not match:
+            result.append(text[pos:])
+            break
+        if match.start() > pos:
+            result.append(text[pos:match.start() - 1])
+        pos = _convert_list_block(text, match.start(), result)
 
+    return '\n'.join(result)
+
+def _convert_list_block(text, pos, result):
+    """Convert the list starting at the line beginning at pos.
+
+    Appends output lines to result and returns the start of the first line
+    after the list (len(text) + 1 if the list runs to the end of text).
+    """
+    n = len(text)
     list_type = None  # 'ul' for unordered, 'ol' for ordered
     current_item_lines = []
     base_indent = 0
 
-    i = 0
-    while i < len(lines):
-        line = lines[i]
+    def close_list():
+        if current_item_lines:
+            result.append('<li>' + ' '.join(current_item_lines) + '</li>')
+        result.append(f'</{list_type}>')
+
+    while pos <= n:
+        end = text.find('\n', pos)
+        if end == -1:
+            end = n
+        line = text[pos:end]
+        pos = end + 1
         stripped = line.strip()
 
-        # Check for list item patterns
         # Match "- " or "* " or "- (label) " where label is (i), (ii), (1), (2), etc.
-        unordered_match = re.match(r'^(\s*)(?:-|\*)\s+(?!\([ivxIVX0-9]+\)\s)(.*)$', line)
-        ordered_match = re.match(r'^(\s*)(?:-|\*)\s+\(([ivxIVX0-9]+)\)\s+(.*)$', line)
-
-        if unordered_match and not ordered_match:
-            # Unordered list item
-            indent = unordered_match.group(1)
-            item_content = unordered_match.group(2).strip()
-
-            if not in_list or list_type != 'ul':
-                if in_list:
-                    # Close previous list item
-                    if current_item_lines:
-                        result.append('<li>' + ' '.join(current_item_lines) + '</li>')
-                        current_item_lines = []
-                    result.append(f'</{list_type}>')
-                result.append('<ul>')
-                in_list = True
-                list_type = 'ul'
-                base_indent = len(indent)
-            else:
-                # Save previous item
-                if current_item_lines:
-                    result.append('<li>' + ' '.join(current_item_lines) + '</li>')
-                    current_item_lines = []
+        item_match = _LIST_ITEM_RE.match(line)
 
-            current_item_lines.append(item_content)
+        if item_match:
+            item_type = 'ol' if item_match.lastindex == 3 else 'ul'
+            indent = item_match.group(1)
+            item_content = item_match.group(item_match.lastindex).strip()
 
-        elif ordered_match:
-            # Ordered list item with label
-            indent = ordered_match.group(1)
-            label = ordered_match.group(2)
-            item_content = ordered_match.group(3).strip()
-
-            if not in_list or list_type != 'ol':
-                if in_list:
-                    # Close previous list item
-                    if current_item_lines:
-                        result.append('<li>' + ' '.join(current_item_lines) + '</li>')
-                        current_item_lines = []
-                    result.append(f'</{list_type}>')
-                result.append('<ol>')
-                in_list = True
-                list_type = 'ol'
+            if list_type != item_type:
+                if list_type:
+                    # Close previous list
+                    close_list()
+                    current_item_lines = []
+                result.append(f'<{item_type}>')
+                list_type = item_type
                 base_indent = len(indent)
-            else:
+            elif current_item_lines:
                 # Save previous item
-                if current_item_lines:
-                    result.append('<li>' + ' '.join(current_item_lines) + '</li>')
-                    current_item_lines = []
+                result.append('<li>' + ' '.join(current_item_lines) + '</li>')
+                current_item_lines = []
 
             current_item_lines.append(item_content)
 
+        elif stripped:
+            # Check if this line is indented and continues the previous item
+            # OR if it's display math (starts with \[ or is just \])
+            line_indent = len(line) - len(line.lstrip())
+            is_display_math = stripped.startswith('\\[') or stripped == '\\]'
+            if line_indent > base_indent or is_display_math:
+                # Continuation of current item
+                current_item_lines.append(stripped)
+            else:
+                # End of list
+                close_list()
+                result.append(line)
+                return pos
+
         else:
-            # Not a list item start
-            if in_list and line.strip():
-                # Check if this line is indented and continues the previous item
-                # OR if it's display math (starts with \[ or is just \])
-                line_indent = len(line) - len(line.lstrip())
-                is_display_math = stripped.startswith('\\[') or stripped == '\\]'
-                if line_indent > base_indent or is_display_math:
-                    # Continuation of current item
-                    current_item_lines.append(line.strip())
-                else:
-                    # End of list
-                    if current_item_lines:
-                        result.append('<li>' + ' '.join(current_item_lines) + '</li>')
-                        current_item_lines = []
-                    result.append(f'</{list_type}>')
-                    in_list = False
-                    list_type = None
-                    result.append(line)
-            elif in_list and not line.strip():
-                # Empty line in list - could be end or spacing
-                # Look ahead to see if more list items follow
-                next_is_list = False
-                if i + 1 < len(lines):
-                    next_line = lines[i + 1]
-                    if re.match(r'^\s*(?:-|\*)\s+', next_line):
-                        next_is_list = True
-
-                if not next_is_list:
-                    # End list
-                    if current_item_lines:
-                        result.append('<li>' + ' '.join(current_item_lines) + '</li>')
-                        current_item_lines = []
-                    result.append(f'</{list_type}>')
-                    in_list = False
-                    list_type = None
+            # Empty line in list - could be end or spacing
+            # Look ahead to see if more list items follow
+            if pos <= n and _LIST_ITEM_LINE_RE.match(text, pos):
                 result.append(line)
             else:
+                close_list()
                 result.append(line)
+                return pos
 
-        i += 1
+    # Close list open at end of text
+    close_list()
+    return pos
 
-    # Close any open list at end
-    if in_list:
-        if current_item_lines:
-            result.append('<li>' + ' '.join(current_item_lines) + '</li>')
-        result.append(f'</{list_type}>')
+@functools.lru_cache(maxsize=1024)
+def _header_id(title_content):
+    """Anchor id for a section title; cached since titles repeat across notes."""
+    # Strip comments from title processing if any?
+    # Clean title for ID: strip latex commands and non-alnum
+    clean_title = _HTML_TAG_RE.sub('', title_content) 
+    clean_title = _LATEX_COMMAND_RE.sub('', clean_title) 
+    clean_title = clean_title.translate(_HEADER_ID_TABLE)
+    return clean_title.strip().lower().replace(' ', '-')
 
-    return '\n'.join(result)
+# "## ", "### " and "#### " headers in one pass; group 1 picks the level
+_MD_HEADER_RE = re.compile(r'^(#{2,4})\s+(.+)$', re.MULTILINE)
+
+def _md_header(match):
+    level = len(match.group(1))
+    return f'<h{level}>{match.group(2)}</h{level}>'
 
 def convert_sections(text):
     """Convert markdown-style headers and LaTeX sections to HTML with robust brace handling"""
@@ -1217,12 +1302,7 @@ def convert_sections(text):
             title_content, cur = parse_balanced(text, cur)
             
             # Generate ID
-            # Strip comments from title processing if any?
-            # Clean title for ID: strip latex commands and non-alnum
-            clean_title = re.sub(r'<[^>]+>', '', title_content) 
-            clean_title = re.sub(r'\\[a-zA-Z]+', '', clean_title) 
-            clean_title = re.sub(r'[^a-zA-Z0-9\s-]', '', clean_title)
-            header_id = clean_title.strip().lower().replace(' ', '-')
+            header_id = _header_id(title_content)
             
             # Fallback ID
             if not header_id or header_id == '-':
@@ -1239,59 +1319,83 @@ def convert_sections(text):
             
     # Markdown headers (Keep regex for simple markdown)
     text = "".join(out)
-    text = re.sub(r'^####\s+(.+)$', r'<h4>\1</h4>', text, flags=re.MULTILINE)
-    text = re.sub(r'^###\s+(.+)$', r'<h3>\1</h3>', text, flags=re.MULTILINE)
-    text = re.sub(r'^##\s+(.+)$', r'<h2>\1</h2>', text, flags=re.MULTILINE)
+    if '#' in text:
+        text = _MD_HEADER_RE.sub(_md_header, text)
     return text
 
+_ARROWS = ('\\to', '\\rightarrow', '\\longrightarrow', '\\longmapsto', '\\hookrightarrow', '\\twoheadrightarrow')
+_COLON_ARROW_RE = re.compile(r':([^:=;]*?)(?=\\(?:to|rightarrow|longrightarrow|longmapsto|hookrightarrow|twoheadrightarrow)\b)')
+_INLINE_MATH_RE = re.compile(r'\$([^$]+)\$')
+_DISPLAY_MATH_RE = re.compile(r'\\\[(.*?)\\\]', re.DOTALL)
+
+def _has_colon_arrow(content):
+    """Cheap pre-check: only content with a colon and an arrow can change."""
+    return ':' in content and any(arrow in content for arrow in _ARROWS)
+
 def fix_math_colons(text):
     """Replace : with \colon in math expressions like f : A -> B"""
     def replace_colon(match):
         content = match.group(1)
+        if not _has_colon_arrow(content):
+            return match.group(0)
         # Look for : followed by something then an arrow
         # We search for : followed by non-punct chars until an arrow
         # Use simple heuristic: if we see : ... \to without intermediate : or = or ;
         # Capturing group 1 is the content between : and arrow
-        content = re.sub(r':([^:=;]*?)(?=\\(?:to|rightarrow|longrightarrow|longmapsto|hookrightarrow|twoheadrightarrow)\b)', r'\\colon\1', content)
+        content = _COLON_ARROW_RE.sub(r'\\colon\1', content)
         return f'${content}$'
 
     # Match inline math. Display math is harder (\[...\])
-    text = re.sub(r'\$([^$]+)\$', replace_colon, text)
+    text = _INLINE_MATH_RE.sub(replace_colon, text)
     
     # Simple display math (\[...\])
     def replace_colon_display(match):
         content = match.group(1)
-        content = re.sub(r':([^:=;]*?)(?=\\(?:to|rightarrow|longrightarrow|longmapsto|hookrightarrow|twoheadrightarrow)\b)', r'\\colon\1', content)
+        if not _has_colon_arrow(content):
+            return match.group(0)
+        content = _COLON_ARROW_RE.sub(r'\\colon\1', content)
         return f'\\[{content}\\]'
         
-    text = re.sub(r'\\\[(.*?)\\\]', replace_colon_display, text, flags=re.DOTALL)
+    text = _DISPLAY_MATH_RE.sub(replace_colon_display, text)
     
     return text
 
+_SEEALSO_MD_LINK_RE = re.compile(r'\[.*?\]\(.*?\)')
+_SEEALSO_ANCHOR_RE = re.compile(r'<a\s+href', re.IGNORECASE)
+_SEEALSO_PDF_RE = re.compile(r'^(.+?\.pdf)(.*)$', re.IGNORECASE)
+_ITEMIZE_OPEN_RE = re.compile(r'\\begin\{itemize\}(?:\[.*?\])?')
+_SEEALSO_ENV_RE = re.compile(r'\\begin\{seealso\}(.*?)\\end\{seealso\}', re.DOTALL)
+# Item separators and the brackets that shield them
+_SEEALSO_DELIM_RE = re.compile(r'[,()\[\]{}]')
+
 def convert_seealso(text):
     """Convert \\SeeAlso command. Run BEFORE link converters."""
+    if '\\SeeAlso' not in text and '\\begin{seealso}' not in text:
+        return text
+
     def split_balanced(s):
+        # Only commas and brackets matter, so jump between them rather
+        # than walking every character
         parts = []
-        current = []
+        start = 0
         balance_paren = 0
         balance_brack = 0
         balance_brace = 0
         
-        for char in s:
-            if char == ',' and balance_paren == 0 and balance_brack == 0 and balance_brace == 0:
-                parts.append("".join(current).strip())
-                current = []
-            else:
-                current.append(char)
-                if char == '(': balance_paren += 1
-                elif char == ')': balance_paren = max(0, balance_paren - 1)
-                elif char == '[': balance_brack += 1
-                elif char == ']': balance_brack = max(0, balance_brack - 1)
-                elif char == '{': balance_brace += 1
-                elif char == '}': balance_brace = max(0, balance_brace - 1)
+        for match in _SEEALSO_DELIM_RE.finditer(s):
+            char = match.group()
+            if char == ',':
+                if balance_paren == 0 and balance_brack == 0 and balance_brace == 0:
+                    parts.append(s[start:match.start()].strip())
+                    start = match.end()
+            elif char == '(': balance_paren += 1
+            elif char == ')': balance_paren = max(0, balance_paren - 1)
+            elif char == '[': balance_brack += 1
+            elif char == ']': balance_brack = max(0, balance_brack - 1)
+            elif char == '{': balance_brace += 1
+            elif char == '}': balance_brace = max(0, balance_brace - 1)
                 
-        if current:
-            parts.append("".join(current).strip())
+        parts.append(s[start:].strip())
         return [p for p in parts if p]
 
     def process_item(item):
@@ -1303,18 +1407,18 @@ def convert_seealso(text):
             
         # 1. Check for existing links (HTML, Markdown, Latex \wref/\href)
         # Regex check for markdown link: [text](url)
-        if re.search(r'\[.*?\]\(.*?\)', item):
+        if _SEEALSO_MD_LINK_RE.search(item):
             return item
         # Regex check for HTML anchor
-        if re.search(r'<a\s+href', item, re.IGNORECASE):
+        if _SEEALSO_ANCHOR_RE.search(item):
             return item
         # Regex check for latex links
-        if re.search(r'\\wref', item) or re.search(r'\\href', item):
+        if '\\wref' in item or '\\href' in item:
             return item
             
         # 2. Check for PDF with description: "foo.pdf (desc)"
         # Simple check: starts with something ending in .pdf
-        pdf_match = re.match(r'^(.+?\.pdf)(.*)$', item, re.IGNORECASE)
+        pdf_match = _SEEALSO_PDF_RE.match(item)
         if pdf_match:
             filename = pdf_match.group(1).strip()
             rest = pdf_match.group(2)
@@ -1366,10 +1470,7 @@ def convert_seealso(text):
                     else:
                         items.append(line) # Should not happen if correctly formatted
                         
-            list_html = "<ul>\n"
-            for item in items:
-                list_html += f"<li>{item}</li>\n"
-            list_html += "</ul>"
+            list_html = f"<ul>\n{render_list_items(items)}</ul>"
             return f'<div class="see-also"><strong>See also:</strong>\n{list_html}</div>'
         else:
             # Inline comma-separated
@@ -1382,20 +1483,17 @@ def convert_seealso(text):
     def replace_seealso_env(match):
         content = match.group(1)
         # Strip \begin{itemize} and \end{itemize} if present
-        content = re.sub(r'\\begin\{itemize\}(?:\[.*?\])?', '', content)
-        content = re.sub(r'\\end\{itemize\}', '', content)
+        content = _ITEMIZE_OPEN_RE.sub('', content)
+        content = content.replace('\\end{itemize}', '')
         
         # Extract items (\item ...)
-        items = re.split(r'\s*\\item\s+', content)
+        items = _ITEM_SPLIT_RE.split(content)
         items = [item.strip() for item in items if item.strip()]
         
-        list_html = "<ul>\n"
-        for item in items:
-             list_html += f"<li>{process_item(item)}</li>\n"
-        list_html += "</ul>"
+        list_html = f"<ul>\n{render_list_items(process_item(item) for item in items)}</ul>"
         return f'<div class="see-also"><strong>See also:</strong>\n{list_html}</div>'
 
-    text = re.sub(r'\\begin\{seealso\}(.*?)\\end\{seealso\}', replace_seealso_env, text, flags=re.DOTALL)
+    text = _SEEALSO_ENV_RE.sub(replace_seealso_env, text)
 
     out_text = []
     idx = 0
@@ -1427,10 +1525,7 @@ def convert_seealso(text):
                         else:
                             items_list.append(line)
                             
-                list_str = "<ul>\n"
-                for it in items_list:
-                    list_str += f"<li>{it}</li>\n"
-                list_str += "</ul>"
+                list_str = f"<ul>\n{render_list_items(items_list)}</ul>"
                 replacement = f'<div class="see-also"><strong>See also:</strong>\n{list_str}</div>'
             else:
                 its = split_balanced(content)
@@ -1445,6 +1540,8 @@ def convert_seealso(text):
             
     return "".join(out_text)
 
+_CITATION_RE = re.compile(r'\(\((.*?)\)\)')
+
 def convert_citations(text):
     """Convert ((Citation)) to [N] and return (text, references_list)"""
     refs = []
@@ -1460,130 +1557,242 @@ def convert_citations(text):
         return f'<sup><a href="#ref-{idx}">[{idx}]</a></sup>'
 
     # Match ((...)) but not nested? strict regex
-    new_text = re.sub(r'\(\((.*?)\)\)', replace_cite, text)
+    new_text = _CITATION_RE.sub(replace_cite, text)
     return new_text, refs
 
+# Tags that should definitely NOT be wrapped in <p>
+_BLOCK_TAGS = (
+    '<div', '<p', '<script', '<ul', '<ol', '<li', 
+    '<h1', '<h2', '<h3', '<h4', '<h5', '<h6', 
+    '<table', '<blockquote', '<section', '<header', '<footer', '<style'
+)
+# Closing tags that end a block (simple heuristic)
+_CLOSING_BLOCK_TAGS = ('</div', '</ul', '</ol', '</table')
+
 def wrap_paragraphs(text):
     """Wrap text paragraphs in <p> tags"""
-    lines = text.split('\n')
     result = []
+    append = result.append
+    para_buffer = []
     in_tag = False
     in_script = False
-    para_buffer = []
-
-    # Tags that should definitely NOT be wrapped in <p>
-    BLOCK_TAGS = (
-        '<div', '<p', '<script', '<ul', '<ol', '<li', 
-        '<h1', '<h2', '<h3', '<h4', '<h5', '<h6', 
-        '<table', '<blockquote', '<section', '<header', '<footer', '<style'
-    )
-
-    for line in lines:
-        stripped = line.strip()
 
-        # Check if we're starting or ending a script/style tag (bypass logic)
-        if '<script' in stripped or '<style' in stripped:
-            if para_buffer:
-                result.append('<p>' + ' '.join(para_buffer) + '</p>')
-                para_buffer = []
-            in_script = True
-            result.append(line)
-            if '</script>' in stripped or '</style>' in stripped:
+    for line in text.split('\n'):
+        # Inside a script/style block lines pass through untouched. The tag
+        # tests are plain substring checks, so they don't need strip().
+        if in_script:
+            append(line)
+            if '</script>' in line or '</style>' in line:
                 in_script = False
             continue
 
-        if in_script:
-            result.append(line)
-            if '</script>' in stripped or '</style>' in stripped:
-                in_script = False
+        # Check if we're starting a script/style tag (bypass logic)
+        if '<script' in line or '<style' in line:
+            if para_buffer:
+                append('<p>' + ' '.join(para_buffer) + '</p>')
+                para_buffer.clear()
+            append(line)
+            in_script = '</script>' not in line and '</style>' not in line
             continue
 
+        stripped = line.strip()
+
         # Check if line starts with a block tag
-        start_is_block = stripped.startswith(BLOCK_TAGS)
-        
-        # Check if line seems to be a closing block tag (simple heuristic)
-        end_is_block = stripped.startswith('</') and (
-            stripped.startswith('</div') or stripped.startswith('</ul') or 
-            stripped.startswith('</ol') or stripped.startswith('</table')
-        )
+        start_is_block = stripped.startswith(_BLOCK_TAGS)
 
-        if start_is_block or end_is_block:
+        if start_is_block or stripped.startswith(_CLOSING_BLOCK_TAGS):
             # Flush paragraph buffer
             if para_buffer:
-                result.append('<p>' + ' '.join(para_buffer) + '</p>')
-                para_buffer = []
-            result.append(line)
+                append('<p>' + ' '.join(para_buffer) + '</p>')
+                para_buffer.clear()
+            append(line)
             
             # Simple multi-line tag tracking (imperfect but helps with divs)
-            if start_is_block and (not '>' in stripped or stripped.count('<') > stripped.count('>')):
-                in_tag = True
-            else:
-                in_tag = False
+            in_tag = start_is_block and ('>' not in stripped or stripped.count('<') > stripped.count('>'))
         elif in_tag:
-            result.append(line)
+            append(line)
             if '>' in stripped:
                 in_tag = False
-        elif stripped == '':
+        elif not stripped:
             # Empty line - flush paragraph
             if para_buffer:
-                result.append('<p>' + ' '.join(para_buffer) + '</p>')
-                para_buffer = []
-            result.append(line)
+                append('<p>' + ' '.join(para_buffer) + '</p>')
+                para_buffer.clear()
+            append(line)
         else:
             # Regular text OR inline tags (<strong>, <a>, etc.) -> add to paragraph
             para_buffer.append(stripped)
 
     # Flush final paragraph
     if para_buffer:
-        result.append('<p>' + ' '.join(para_buffer) + '</p>')
+        append('<p>' + ' '.join(para_buffer) + '</p>')
 
     return '\n'.join(result)
 
-def get_last_modified(tex_path):
-    """Get last modified date of the TeX file"""
-    if os.path.exists(tex_path):
-        mtime = os.path.getmtime(tex_path)
-        return datetime.fromtimestamp(mtime).strftime('%Y-%m-%d')
-    return datetime.now().strftime('%Y-%m-%d')
-
 def extract_wikilinks(content):
     """Extract all wikilink targets from LaTeX content"""
+    # Substring test is far cheaper than starting the regex on link-free notes
+    if '\\wref' not in content:
+        return []
     links = set()
     # Match \wref[display]{target} and \wref{target}
-    for match in re.finditer(r'\\wref(?:\[[^\]]+\])?\{([^}]+)\}', content):
-        target = match.group(1)
+    for match in _WREF_RE.finditer(content):
+        target = match.group(2)
         # Remove any PDF anchors (e.g., file.pdf#page=...)
         if '.pdf' in target:
             continue
         links.add(target)
     return sorted(links)
 
-def build_backlinks_map(notes_dir):
-    """Build a map of note -> list of notes that link to it"""
-    backlinks = {}
-    note_files = {}
+# Per-note wikilink cache, keyed by absolute path and validated by mtime/size
+LINK_CACHE_FILE = Path(__file__).resolve().parent.parent / ".gwiki-linkcache.json"
 
-    # First, get all note files
-    for filepath in Path(notes_dir).glob('*.tex'):
-        basename = filepath.stem
-        note_files[basename] = filepath
-        backlinks[basename] = []
+# Bump when _scan_note_links changes what it extracts
+LINK_CACHE_VERSION = 2
 
-    # Now scan each file for links
-    for source_name, filepath in note_files.items():
+def _load_link_cache(cache_path):
+    """Return the saved {path: {mtime, size, links}} map, or {} if unusable."""
+    try:
+        with open(cache_path, 'r', encoding='utf-8') as f:
+            cache = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    if not isinstance(cache, dict) or cache.get('version') != LINK_CACHE_VERSION:
+        return {}
+    notes = cache.get('notes')
+    return notes if isinstance(notes, dict) else {}
+
+def _save_link_cache(cache_path, cache):
+    """Write the link cache atomically; failures are ignored."""
+    tmp_path = cache_path.with_name(f"{cache_path.name}.{os.getpid()}.tmp")
+    try:
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'version': LINK_CACHE_VERSION, 'notes': cache}, f)
+        os.replace(tmp_path, cache_path)
+    except OSError:
         try:
-            with open(filepath, 'r', encoding='utf-8') as f:
-                content = f.read()
-            links = extract_wikilinks(content)
-            for target in links:
-                if target in backlinks:
-                    backlinks[target].append(source_name)
-        except Exception:
-            continue
-    return backlinks
+            os.remove(tmp_path)
+        except OSError:
+            pass
 
-def generate_macros(extra_macros=None):
-    """Generate KaTeX macros dynamically."""
+# Byte-level \wref pattern for the backlinks scan. '}' and ']' never occur
+# inside a multi-byte UTF-8 sequence, so the captured targets decode cleanly.
+_WREF_BYTES_RE = re.compile(rb'\\wref(?:\[[^\]]+\])?\{([^}]+)\}')
+_COMMENT_BYTES_RE = re.compile(rb'(?<!\\)%.*$', re.MULTILINE)
+
+def _scan_note_links(filepath):
+    """Return the wikilink targets of one note, or None if it can't be read.
+
+    The note is scanned as raw bytes; only the captured targets are decoded.
+    Comments are stripped first, so the result matches what
+    extract_wikilinks finds in convert_to_html.
+    """
+    try:
+        with open(filepath, 'rb') as f:
+            data = f.read()
+        if b'\\wref' not in data:
+            return []
+        if b'%' in data:
+            data = _COMMENT_BYTES_RE.sub(b'', data)
+        links = set()
+        for match in _WREF_BYTES_RE.finditer(data):
+            target = match.group(1)
+            # Remove any PDF anchors (e.g., file.pdf#page=...) before decoding
+            if b'.pdf' in target:
+                continue
+            links.add(target.decode('utf-8'))
+        return sorted(links)
+    except Exception:
+        return None
+
+# Below this many uncached notes, process start-up costs more than it saves
+_PROCESS_SCAN_MIN_NOTES = 256
+
+def build_backlinks_map(notes_dir):
+    """Build a map of note -> list of notes that link to it.
+
+    Returns (backlinks, outgoing), where outgoing maps each readable note to
+    its sorted wikilink targets, so converting it needn't scan for them again.
+    """
+    backlinks = {}
+    note_files = {}
+    note_stats = {}
+
+    # First, get all note files (scandir yields plain strings, no Path objects)
+    with os.scandir(notes_dir) as entries:
+        for entry in entries:
+            if entry.name.endswith('.tex') and len(entry.name) > 4:
+                # Interned: the same names are looked up as link targets
+                basename = sys.intern(entry.name[:-4])
+                note_files[basename] = entry.path
+                backlinks[basename] = []
+                try:
+                    st = entry.stat()
+                    note_stats[basename] = (st.st_mtime_ns, st.st_size)
+                except OSError:
+                    pass
+
+    # Reuse cached links for notes whose mtime and size are unchanged
+    old_cache = _load_link_cache(LINK_CACHE_FILE)
+    notes_abs = os.path.abspath(notes_dir)
+    # Entries for other note directories are carried over untouched
+    new_cache = {key: value for key, value in old_cache.items()
+                 if os.path.dirname(key) != notes_abs}
+    note_links = {}
+    to_scan = []
+    for basename, filepath in note_files.items():
+        key = os.path.abspath(filepath)
+        cached = old_cache.get(key)
+        stat = note_stats.get(basename)
+        if (stat and isinstance(cached, dict)
+                and cached.get('mtime') == stat[0] and cached.get('size') == stat[1]):
+            note_links[basename] = [sys.intern(target) for target in cached.get('links', [])]
+            new_cache[key] = cached
+        else:
+            to_scan.append(basename)
+
+    # Scan the rest. A few notes are I/O-bound, so threads overlap the
+    # reads; a large cold scan is regex-bound and holds the GIL, so it is
+    # spread over worker processes when there is more than one core.
+    if to_scan:
+        cpu_count = os.cpu_count() or 1
+        if len(to_scan) >= _PROCESS_SCAN_MIN_NOTES and cpu_count > 1:
+            executor = ProcessPoolExecutor()
+            chunksize = 16
+        else:
+            executor = ThreadPoolExecutor(max_workers=min(32, cpu_count * 4))
+            chunksize = 1
+        with executor:
+            scanned = executor.map(_scan_note_links, [note_files[b] for b in to_scan],
+                                   chunksize=chunksize)
+            for basename, links in zip(to_scan, scanned):
+                if links is None:
+                    continue
+                # Interned here, not in the scan: workers may be separate
+                # processes, and interning does not survive pickling
+                links = [sys.intern(target) for target in links]
+                note_links[basename] = links
+                stat = note_stats.get(basename)
+                if stat:
+                    new_cache[os.path.abspath(note_files[basename])] = {
+                        'mtime': stat[0], 'size': stat[1], 'links': links
+                    }
+
+    if new_cache != old_cache:
+        _save_link_cache(LINK_CACHE_FILE, new_cache)
+
+    # Fill backlinks in note order
+    for source_name in note_files:
+        for target in note_links.get(source_name, ()):
+            if target in backlinks:
+                backlinks[target].append(source_name)
+    return backlinks, note_links
+
+_MACRO_PARAM_RE = re.compile(r'(?<!\\)#(\d)')
+
+@functools.lru_cache(maxsize=1)
+def _builtin_macros():
+    """The built-in KaTeX macros, built once; callers must not mutate it."""
     # KaTeX macros dict: "\\command": "definition"
     macro_dict = {}
     
@@ -1740,9 +1949,65 @@ def generate_macros(extra_macros=None):
     add("lsjto", r"\longrightarrow\!\!\!\!\!\rightarrow") 
     add("id", r"\mathrm{id}")
     add("Hom", r"\operatorname{Hom}")
-    
+
+    return macro_dict
+
+@functools.lru_cache(maxsize=4096)
+def _macro_js_entry(k, v):
+    """One rendered '"name": ...' line of the macros object.
+
+    Cached, as the same built-in definitions are rendered for every note.
+    """
+    # Key must be quoted string, value must be quoted string or array
+    # MathJax 3 macros: keys should NOT have leading backslash
+    key = k
+    if key.startswith('\\'):
+        key = key[1:]
+        
+    js_key = key
+    
+    # Check for arguments (#1, #2, etc.)
+    # Find the max n in #n, ensuring it's not escaped \#
+    # MathJax macro definition string uses #n.
+    
+    # We need to detect "real" parameters.
+    # simple heuristic: look for # followed by digit.
+    # But exclude \#.
+    
+    # Since v is raw latex string (e.g. "\left\langle #1 \right\rangle"),
+    # #1 is a param. \# is a literal hash.
+    
+    matches = _MACRO_PARAM_RE.findall(v)
+    max_arg = 0
+    if matches:
+        max_arg = max(int(m) for m in matches)
+        
+    # Escape backslashes in value for JS string
+    # We need double backslashes for JS string: \rightarrow -> \\rightarrow
+    # Also, we need to handle double quotes if present?
+    js_val = v.replace('\\', '\\\\').replace('"', '\\"')
+    
+    if max_arg > 0:
+        # Macro with args: ["expansion", num_args]
+        return f'        "{js_key}": ["{js_val}", {max_arg}]'
+    else:
+        # Simple macro: "expansion"
+        return f'        "{js_key}": "{js_val}"'
+
+def generate_macros(extra_macros=None):
+    """Generate KaTeX macros dynamically."""
+    # KaTeX macros dict: "\\command": "definition"
+    macro_dict = _builtin_macros()
+
     # File-specific macros (automatic parsing) - THESE OVERRIDE
     if extra_macros:
+        macro_dict = dict(macro_dict)
+
+        def add(k, v):
+            # Ensure key starts with \
+            key = "\\" + k.lstrip("\\")
+            macro_dict[key] = v
+
         for name, defn in extra_macros.items():
             # Check if it has arguments or is simple
             if isinstance(defn, list):
@@ -1759,47 +2024,13 @@ def generate_macros(extra_macros=None):
                 add(name, defn)
 
     # Convert to Javascript object string
-    lines = []
-    import re
-    
-    for k, v in macro_dict.items():
-        # Key must be quoted string, value must be quoted string or array
-        # MathJax 3 macros: keys should NOT have leading backslash
-        key = k
-        if key.startswith('\\'):
-            key = key[1:]
-            
-        js_key = key
-        
-        # Check for arguments (#1, #2, etc.)
-        # Find the max n in #n, ensuring it's not escaped \#
-        # MathJax macro definition string uses #n.
-        
-        # We need to detect "real" parameters.
-        # simple heuristic: look for # followed by digit.
-        # But exclude \#.
-        
-        # Since v is raw latex string (e.g. "\left\langle #1 \right\rangle"),
-        # #1 is a param. \# is a literal hash.
-        
-        matches = re.findall(r'(?<!\\)#(\d)', v)
-        max_arg = 0
-        if matches:
-            max_arg = max(int(m) for m in matches)
-            
-        # Escape backslashes in value for JS string
-        # We need double backslashes for JS string: \rightarrow -> \\rightarrow
-        # Also, we need to handle double quotes if present?
-        js_val = v.replace('\\', '\\\\').replace('"', '\\"')
-        
-        if max_arg > 0:
-            # Macro with args: ["expansion", num_args]
-            lines.append(f'        "{js_key}": ["{js_val}", {max_arg}]')
-        else:
-            # Simple macro: "expansion"
-            lines.append(f'        "{js_key}": "{js_val}"')
+    return ",\n".join([_macro_js_entry(k, v) for k, v in macro_dict.items()])
 
-    return ",\n".join(lines)
+_FRONTMATTER_RE = re.compile(r'^---\s*\n(.*?)\n---\s*\n', re.DOTALL)
+_FM_DATE_CREATED_RE = re.compile(r'^date created:\s*(.+)$', re.MULTILINE | re.IGNORECASE)
+_FM_DATE_RE = re.compile(r'^date:\s*(.+)$', re.MULTILINE | re.IGNORECASE)
+_FM_DATE_MODIFIED_RE = re.compile(r'^date modified:\s*(.+?)(?=\n[a-z]|\n---|\Z)', re.MULTILINE | re.IGNORECASE | re.DOTALL)
+_TIMEZONE_SUFFIX_RE = re.compile(r'\s+[A-Z]{2,3}$')
 
 def get_creation_date_from_md(note_name):
     """Try to get creation date from original markdown file."""
@@ -1819,14 +2050,14 @@ def get_creation_date_from_md(note_name):
     try:
         content = md_path.read_text(encoding='utf-8')
         # Extract frontmatter
-        match = re.search(r'^---\s*\n(.*?)\n---\s*\n', content, re.DOTALL)
+        match = _FRONTMATTER_RE.search(content)
         if match:
             fm = match.group(1)
             # Find date: date created: ... or date: ...
             # Prioritize 'date created'
-            date_match = re.search(r'^date created:\s*(.+)$', fm, re.MULTILINE | re.IGNORECASE)
+            date_match = _FM_DATE_CREATED_RE.search(fm)
             if not date_match:
-                 date_match = re.search(r'^date:\s*(.+)$', fm, re.MULTILINE | re.IGNORECASE)
+                 date_match = _FM_DATE_RE.search(fm)
                  
             if date_match:
                 raw_full = date_match.group(1).strip()
@@ -1837,7 +2068,7 @@ def get_creation_date_from_md(note_name):
                 
                 # Handling: August 17, 2025 at 10:09 pm ET
                 # Strip ET/CT/MT/PT etc if simplistic
-                raw = re.sub(r'\s+[A-Z]{2,3}$', '', raw_full) # Remove timezone suffix
+                raw = _TIMEZONE_SUFFIX_RE.sub('', raw_full) # Remove timezone suffix
                 raw = raw.replace(' at ', ' ') # Remove ' at '
                 
                 # Check for am/pm and convert to AM/PM for %p
@@ -1883,11 +2114,11 @@ def get_modified_date_from_md(note_name):
         
     try:
         content = md_path.read_text(encoding='utf-8')
-        match = re.search(r'^---\s*\n(.*?)\n---\s*\n', content, re.DOTALL)
+        match = _FRONTMATTER_RE.search(content)
         if match:
             fm = match.group(1)
             # Find date modified - could be a single line or a YAML list
-            date_match = re.search(r'^date modified:\s*(.+?)(?=\n[a-z]|\n---|\Z)', fm, re.MULTILINE | re.IGNORECASE | re.DOTALL)
+            date_match = _FM_DATE_MODIFIED_RE.search(fm)
             
             if date_match:
                 raw_dates = date_match.group(1).strip()
@@ -1898,7 +2129,7 @@ def get_modified_date_from_md(note_name):
                     if not line:
                         continue
                     # Clean up: remove timezone suffix, ' at '
-                    cleaned = re.sub(r'\s+[A-Z]{2,3}$', '', line)
+                    cleaned = _TIMEZONE_SUFFIX_RE.sub('', line)
                     cleaned = cleaned.replace(' at ', ' ')
                     if 'am' in cleaned: cleaned = cleaned.replace('am', 'AM')
                     if 'pm' in cleaned: cleaned = cleaned.replace('pm', 'PM')
@@ -1930,6 +2161,9 @@ def get_modified_date_from_md(note_name):
         return None, None
     return None, None
 
+_MD_FOOTNOTE_DEF_RE = re.compile(r'^\[\^([^\]]+)\]:\s*(.*)$', re.MULTILINE)
+_MD_FOOTNOTE_REF_RE = re.compile(r'\[\^([^\]]+)\](?!:)')
+
 def convert_footnotes(text):
     """Convert \\footnote{...} and [^1] / [^1]: ... to HTML footnotes"""
     
@@ -1944,7 +2178,7 @@ def convert_footnotes(text):
         definitions[fid] = content
         return "" # Remove definition line
         
-    text = re.sub(r'^\[\^([^\]]+)\]:\s*(.*)$', extract_md_defs, text, flags=re.MULTILINE)
+    text = _MD_FOOTNOTE_DEF_RE.sub(extract_md_defs, text)
     
     # 2. Parse inline LaTeX footnotes \\footnote{content}
     # We replace them with a marker [^auto-N] and add definition
@@ -2001,13 +2235,13 @@ def convert_footnotes(text):
         # Verify we know this def? or just assume it will exist?
         return f'<sup id="fnref-{fid}"><a href="#fn-{fid}">[{fid}]</a></sup>'
         
-    text = re.sub(r'\[\^([^\]]+)\](?!:)', replace_md_ref, text)
+    text = _MD_FOOTNOTE_REF_RE.sub(replace_md_ref, text)
 
     # 4. Generate Footer HTML
     if not definitions:
         return text
         
-    footer = '\n<div class="footnotes">\n<hr>\n<ol>'
+    footer = ['\n<div class="footnotes">\n<hr>\n<ol>']
     # Sort definitions?
     # Md definitions by key, Auto definitions by numeric order?
     # Let's just output them.
@@ -2028,14 +2262,130 @@ def convert_footnotes(text):
         
         # Backlink
         backlink = f' <a href="#fnref-{fid}">↩</a>'
-        footer += f'\n<li id="fn-{fid}">{content}{backlink}</li>'
-        
-    footer += '\n</ol>\n</div>'
-    
-    return text + footer
+        footer.append(f'\n<li id="fn-{fid}">{content}{backlink}</li>')
+        
+    footer.append('\n</ol>\n</div>')
+    
+    return text + "".join(footer)
+
+# Patterns used once per note by convert_to_html, compiled at import
+_NOTE_CHROME_RE = re.compile(r'\\(?:NoteNavigation|NoteHeader|References|Footer)')
+_SIZE_COMMAND_RE = re.compile(r'\\(?:huge|Huge|HUGE|large|Large|LARGE|small|Small|footnotesize|scriptsize|tiny|normalsize)\b')
+# Unrolled "anything up to the first closing tag" loops instead of lazy .*?
+_SCRIPT_RE = re.compile(r'<script[^>]*>[^<]*(?:<(?!/script>)[^<]*)*</script>')
+_DOUBLE_DOLLAR_RE = re.compile(r'\$\$(.*?)\$\$', re.DOTALL)
+_PAREN_MATH_RE = re.compile(r'\\\((.*?)\\\)', re.DOTALL)
+_DOLLAR_MATH_RE = re.compile(r'(?<!\\)\$[^$]+(?<!\\)\$')
+_PDF_EMBED_RE = re.compile(r'!\[\[(.*?)\]\]')
+# No leading zeros, so only the exact placeholders emitted by the stashers match
+_MATH_PLACEHOLDER_RE = re.compile(r'__MATH_BLOCK_(0|[1-9]\d*)__')
+_SCRIPT_PLACEHOLDER_RE = re.compile(r'__SCRIPT_BLOCK_(0|[1-9]\d*)__')
+_CUSTOM_COMMAND_RE = re.compile(r'\\(arxiv|nlab|prereq|IncomingLinks)\{([^}]+)\}')
+_ALLFORMATS_RE = re.compile(r'\\allformats\{[^}]+\}')
+_CENTER_RE = re.compile(r'\\begin\{center\}([^\\]*(?:\\(?!end\{center\})[^\\]*)*)\\end\{center\}')
+_H2_SECTION_RE = re.compile(r'<h2[^>]*id="([^"]+)"[^>]*>([^<\n]*(?:<(?!/h2>)[^<\n]*)*)</h2>')
+
+# Static page head, cut at the per-note fields it is joined with
+_HEAD_TO_TITLE = '''<!DOCTYPE html>
+<html lang="en">
+<head>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <title>'''
+_HEAD_TO_MACROS = ''' - GWiki</title>
+    <link rel="preconnect" href="https://fonts.googleapis.com">
+    <link rel="preconnect" href="https://fonts.gstatic.com" crossorigin>
+    <link href="https://fonts.googleapis.com/css2?family=Inter:wght@400;600;700&family=JetBrains+Mono:wght@400;500&family=Merriweather:ital,wght@0,300;0,400;0,700;1,400&display=swap" rel="stylesheet">
+    <link rel="stylesheet" type="text/css" href="style.css">
+    <link rel="stylesheet" type="text/css" href="https://tikzjax.com/v1/fonts.css">
+    <script>
+    window.MathJax = {
+      tex: {
+        inlineMath: [['$', '$'], ['\\\\(', '\\\\)']],
+        displayMath: [['$$', '$$'], ['\\\\[', '\\\\]']],
+        processEscapes: true,
+        macros: {
+'''
+_HEAD_TO_PDF_NAME = '''
+        }
+      },
+      startup: {
+        typeset: true
+      }
+    };
+    </script>
+    <script id="MathJax-script" async src="https://cdn.jsdelivr.net/npm/mathjax@3/es5/tex-mml-chtml.js"></script>
+    <script src="https://tikzjax.com/v1/tikzjax.js"></script>
+</head>
+<body>
+    <div class="top-nav">
+        <div class="nav-left">
+            <a href="../index.html" class="nav-link">
+                <svg width="16" height="16" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2">
+                    <path d="M19 12H5M12 19l-7-7 7-7"/>
+                </svg>
+                <span>Index</span>
+            </a>
+        </div>
+        <div class="nav-right">
+            <a href="../pdfs/'''
+_HEAD_TO_MD_NAME = '''.pdf#page=1.00&gsr=0" class="nav-btn" title="View PDF" target="_blank">
+                <span>PDF</span>
+            </a>
+            <a href="obsidian://open?path=/Users/greysonwesley/Desktop/workflow/wiki/'''
+_HEAD_TO_H1_TITLE = '''.md" class="nav-btn" title="Edit in Obsidian">
+                <span>MD</span>
+            </a>
+        </div>
+    </div>
+    <div class="content-wrapper">
+    <h1>'''
+_HEAD_TO_LAST_MODIFIED = '''</h1>
+    <div class="metadata">
+        <strong>Last modified:</strong> '''
+_HEAD_TO_CREATED = '''<br>
+        <strong>Created:</strong> '''
+_HEAD_END = '''<br>'''
+
+# Static page sections around the per-note lists
+_LINKED_NOTES_OPEN = '''
+
+    <div class="linked-notes">
+        <h2>Linked Notes</h2>
+        <ul>'''
+_BACKLINKS_OPEN = '''
+
+    <div class="backlinks">
+        <h2>Backlinks</h2>
+        <ul>'''
+_LIST_SECTION_CLOSE = '''
+        </ul>
+    </div>'''
+_HTML_TAIL = '''
+    </div>
+</body>
+</html>
+'''
+
+# Macros every TikZ block may rely on, ahead of the note's own \newcommands
+_TIKZ_GLOBAL_MACROS = (
+    r"\newcommand{\bd}{\partial}" + "\n"
+    r"\newcommand{\tms}{\times}" + "\n"
+    r"\newcommand{\tsr}{\otimes}" + "\n"
+    r"\newcommand{\orev}{\overline}" + "\n"
+    r"\newcommand{\F}{\mathcal{F}}" + "\n" # Default F
+)
 
+@functools.lru_cache(maxsize=1)
+def _load_creation_dates(metadata_path, mtime_ns):
+    """Parsed creation_dates of .gwiki-metadata.json, read once per file version.
 
-def convert_to_html(tex_path, backlinks_map, title_map):
+    mtime_ns is only part of the cache key, so an edited file is re-read.
+    """
+    with open(metadata_path, 'r', encoding='utf-8') as f:
+        return json.load(f).get('creation_dates', {})
+
+def convert_to_html(tex_path, backlinks_map, title_map, outgoing_map=None):
     try:
         content = Path(tex_path).read_text(encoding='utf-8')
     except Exception as e:
@@ -2058,13 +2408,10 @@ def convert_to_html(tex_path, backlinks_map, title_map):
     body = extract_body(content)
 
     # Strip known non-semantic commands first
-    body = re.sub(r'\\NoteNavigation', '', body)
-    body = re.sub(r'\\NoteHeader', '', body)
-    body = re.sub(r'\\References', '', body)
-    body = re.sub(r'\\Footer', '', body)
+    body = _NOTE_CHROME_RE.sub('', body)
     
     # Strip LaTeX sizing commands that should not appear in HTML
-    body = re.sub(r'\\(?:huge|Huge|HUGE|large|Large|LARGE|small|Small|footnotesize|scriptsize|tiny|normalsize)\b', '', body)
+    body = _SIZE_COMMAND_RE.sub('', body)
 
     # Validating layout: content-wrapper starts at 2227. 
     # Metadata closes at 2286 (approx).
@@ -2073,13 +2420,7 @@ def convert_to_html(tex_path, backlinks_map, title_map):
     # Original design was inside.
     
     # Construct LaTeX macros for TikZ
-    tikz_macros = ""
-    # Add critical globals
-    tikz_macros += r"\newcommand{\bd}{\partial}" + "\n"
-    tikz_macros += r"\newcommand{\tms}{\times}" + "\n"
-    tikz_macros += r"\newcommand{\tsr}{\otimes}" + "\n"
-    tikz_macros += r"\newcommand{\orev}{\overline}" + "\n"
-    tikz_macros += r"\newcommand{\F}{\mathcal{F}}" + "\n" # Default F
+    tikz_macro_parts = [_TIKZ_GLOBAL_MACROS]
     
     if file_macros:
         for name, defn in file_macros.items():
@@ -2087,9 +2428,10 @@ def convert_to_html(tex_path, backlinks_map, title_map):
                 # defn = [body, nargs]
                 # TikZJax supports \newcommand{\foo}[n]{...} ? Yes likely.
                 # Use raw string
-                tikz_macros += f"\\newcommand{{\\{name}}}[{defn[1]}]{{{defn[0]}}}\n"
+                tikz_macro_parts.append(f"\\newcommand{{\\{name}}}[{defn[1]}]{{{defn[0]}}}\n")
             else:
-                 tikz_macros += f"\\newcommand{{\\{name}}}{{{defn}}}\n"
+                 tikz_macro_parts.append(f"\\newcommand{{\\{name}}}{{{defn}}}\n")
+    tikz_macros = "".join(tikz_macro_parts)
 
     # 2. Convert TikZ and stash scripts
     body = convert_tikz(body, extra_preamble=tikz_macros)
@@ -2097,7 +2439,7 @@ def convert_to_html(tex_path, backlinks_map, title_map):
     def stash_all_scripts(match):
         script_blocks.append(match.group(0))
         return f'__SCRIPT_BLOCK_{len(script_blocks) - 1}__'
-    body = re.sub(r'<script.*?>.*?</script>', stash_all_scripts, body, flags=re.DOTALL)
+    body = _SCRIPT_RE.sub(stash_all_scripts, body)
 
 
 
@@ -2107,6 +2449,12 @@ def convert_to_html(tex_path, backlinks_map, title_map):
 
 
 
+    # One stat of the source serves both the created and modified fallbacks
+    try:
+        tex_stat = os.stat(tex_path)
+    except OSError:
+        tex_stat = None
+
     # Load creation dates
     root_dir = Path(__file__).resolve().parent.parent
     metadata_file = root_dir / ".gwiki-metadata.json"
@@ -2118,11 +2466,10 @@ def convert_to_html(tex_path, backlinks_map, title_map):
         created_date = md_date
 
     # 2. Try metadata file (backup)
-    if created_date == "?" and metadata_file.exists():
+    if created_date == "?":
         try:
-            import json
-            data = json.loads(metadata_file.read_text())
-            c_date_iso = data.get('creation_dates', {}).get(note_name)
+            metadata_mtime = os.stat(metadata_file).st_mtime_ns
+            c_date_iso = _load_creation_dates(str(metadata_file), metadata_mtime).get(note_name)
             if c_date_iso:
                  # Parse YYYY-MM-DD
                  dt = datetime.strptime(c_date_iso, '%Y-%m-%d')
@@ -2131,12 +2478,11 @@ def convert_to_html(tex_path, backlinks_map, title_map):
             pass
             
     # Fallback to OS creation time if still ?
-    if created_date == "?" and os.path.exists(tex_path):
+    if created_date == "?" and tex_stat is not None:
         try:
             # st_birthtime is mac specific, st_ctime is creation on Windows, metadata change on Unix
             # On Mac, st_birthtime exists.
-            stat = os.stat(tex_path)
-            c_time = getattr(stat, 'st_birthtime', stat.st_ctime) 
+            c_time = getattr(tex_stat, 'st_birthtime', tex_stat.st_ctime) 
             created_date = datetime.fromtimestamp(c_time).strftime('%B %d, %Y at %l:%M %p ET')
         except:
             pass
@@ -2144,12 +2490,6 @@ def convert_to_html(tex_path, backlinks_map, title_map):
     if note_name == 'index' and created_date == '?':
         created_date = datetime.now().strftime('%B %d, %Y at %l:%M %p ET')
 
-    # Build compact TOC
-    toc_html = ""
-    toc_limit = 10
-    
-    sections = []
-    
     # Determine Last Modified date:
     # 1. Get date from Obsidian MD frontmatter (source of truth)
     # 2. Get TEX file mtime (in case LaTeX was edited directly)
@@ -2159,9 +2499,8 @@ def convert_to_html(tex_path, backlinks_map, title_map):
     
     tex_modified_dt = None
     tex_modified_str = None
-    if os.path.exists(tex_path):
-        tex_mtime = os.path.getmtime(tex_path)
-        tex_modified_dt = datetime.fromtimestamp(tex_mtime)
+    if tex_stat is not None:
+        tex_modified_dt = datetime.fromtimestamp(tex_stat.st_mtime)
         tex_modified_str = tex_modified_dt.strftime('%B %d, %Y at %l:%M %p ET')
     
     # Use the most recent date
@@ -2177,8 +2516,10 @@ def convert_to_html(tex_path, backlinks_map, title_map):
     else:
         last_modified = datetime.now().strftime('%B %d, %Y at %l:%M %p ET')
 
-    # Get outgoing links and backlinks
-    outgoing_links = extract_wikilinks(content)
+    # Get outgoing links (already found by build_backlinks_map if given) and backlinks
+    outgoing_links = outgoing_map.get(note_name) if outgoing_map else None
+    if outgoing_links is None:
+        outgoing_links = extract_wikilinks(content)
     backlinks = backlinks_map.get(note_name, []) if backlinks_map else []
 
     # Body conversion pipeline
@@ -2196,13 +2537,13 @@ def convert_to_html(tex_path, backlinks_map, title_map):
     # First convert $$...$$ to \[...\] (standardize display math)
     # Stash math: $$...$$, \[...\], \(...\), $...$
     # First convert $$...$$ to \[...\] (standardize display math)
-    body = re.sub(r'\$\$(.*?)\$\$', r'\\[\1\\]', body, flags=re.DOTALL)
+    body = _DOUBLE_DOLLAR_RE.sub(r'\\[\1\\]', body)
 
-    body = re.sub(r'\\\[.*?\\\]', stash_math, body, flags=re.DOTALL)
-    body = re.sub(r'\\\((.*?)\\\)', stash_math, body, flags=re.DOTALL)
+    body = _DISPLAY_MATH_RE.sub(stash_math, body)
+    body = _PAREN_MATH_RE.sub(stash_math, body)
     # Inline math $...$
     # Inline math $...$
-    body = re.sub(r'(?<!\\)\$[^$]+(?<!\\)\$', stash_math, body)
+    body = _DOLLAR_MATH_RE.sub(stash_math, body)
 
     # 3. Escape HTML special characters in remaining text (including math if not stashed)
     # CRITICAL: We must escape HTML < and > BEFORE generating HTML tags (links, etc.)
@@ -2234,50 +2575,42 @@ def convert_to_html(tex_path, backlinks_map, title_map):
     
     body = convert_seealso(body)
     
-    body = re.sub(r'!\[\[(.*?)\]\]', convert_pdf_embed, body)
+    body = _PDF_EMBED_RE.sub(convert_pdf_embed, body)
 
     body = convert_wikilinks(body, title_map)
     body = convert_markdown_links(body)  # Add markdown link support
     
-    # Custom commands
-    def convert_arxiv(text):
-        """Convert \\arxiv{id} to link"""
-        return re.sub(r'\\arxiv\{([^}]+)\}', r'<a href="https://arxiv.org/abs/\1">arXiv:\1</a>', text)
-
-    def strip_incoming_links(text):
-        """Remove \\IncomingLinks{...}"""
-        return re.sub(r'\\IncomingLinks\{[^}]+\}', '', text)
-        
-    def convert_nlab(text):
-        """Convert \\nlab{keyword} to link"""
-        return re.sub(r'\\nlab\{([^}]+)\}', r'<a href="https://ncatlab.org/nlab/show/\1" class="nlab-link">nLab:\1</a>', text)
-
-    def convert_prereq(text, title_map=None):
-        """Convert \\prereq{a,b} into a list of links"""
-        def replace(match):
-            content = match.group(1)
-            items = [x.strip() for x in content.split(',')]
-            links = []
-            for item in items:
-                link = item
-                if title_map and item in title_map:
-                    link = f'<a href="{title_map[item]}">{item}</a>'
-                else:
-                    # simplistic fallback
-                    link = f'<a href="{item}.html">{item}</a>'
-                links.append(link)
-            return f'<div class="prereq"><strong>Prerequisites:</strong> {", ".join(links)}</div>'
-        return re.sub(r'\\prereq\{([^}]+)\}', replace, text)
-
-    body = convert_arxiv(body)
-    body = convert_nlab(body)
-    body = convert_prereq(body, title_map)
-    body = strip_incoming_links(body)
+    # Custom commands: \arxiv{id}, \nlab{keyword}, \prereq{a,b} and
+    # \IncomingLinks{...} are converted in one pass over the body
+    def convert_prereq(content):
+        """Convert the argument of \\prereq{a,b} into a list of links"""
+        items = [x.strip() for x in content.split(',')]
+        links = []
+        for item in items:
+            link = item
+            if title_map and item in title_map:
+                link = f'<a href="{title_map[item]}">{item}</a>'
+            else:
+                # simplistic fallback
+                link = f'<a href="{item}.html">{item}</a>'
+            links.append(link)
+        return f'<div class="prereq"><strong>Prerequisites:</strong> {", ".join(links)}</div>'
+
+    def convert_custom_command(match):
+        cmd, arg = match.groups()
+        if cmd == 'arxiv':
+            return f'<a href="https://arxiv.org/abs/{arg}">arXiv:{arg}</a>'
+        if cmd == 'nlab':
+            return f'<a href="https://ncatlab.org/nlab/show/{arg}" class="nlab-link">nLab:{arg}</a>'
+        if cmd == 'prereq':
+            return convert_prereq(arg)
+        # \IncomingLinks{...} is dropped
+        return ''
+
+    body = _CUSTOM_COMMAND_RE.sub(convert_custom_command, body)
     
     # Restore math blocks (since we escaped HTML earlier, we resolve math now)
-    for i, block in enumerate(math_blocks):
-        # Restore math block
-        body = body.replace(f'__MATH_BLOCK_{i}__', block)
+    body = restore_placeholders(_MATH_PLACEHOLDER_RE, math_blocks, body)
     
     # DEBUG: Trace disappearing math
     debug_marker = "Integrating both sides from"
@@ -2306,7 +2639,7 @@ def convert_to_html(tex_path, backlinks_map, title_map):
         print(f"[DEBUG] Post-formatting: {body[body.find(debug_marker):body.find(debug_marker)+100]}")
     
     # Remove \allformats{...}
-    body = re.sub(r'\\allformats\{[^}]+\}', '', body)
+    body = _ALLFORMATS_RE.sub('', body)
 
     # Convert texorpdfstring early
     body = convert_texorpdfstring(body)
@@ -2314,9 +2647,8 @@ def convert_to_html(tex_path, backlinks_map, title_map):
     # Handle citations
     body, references = convert_citations(body)
     
-    # Restore math blocks (processed in reverse order to handle nested stash)
-    for i, block in reversed(list(enumerate(math_blocks))):
-        body = body.replace(f'__MATH_BLOCK_{i}__', block)
+    # Restore math blocks again, this time including placeholders nested in blocks
+    body = restore_placeholders(_MATH_PLACEHOLDER_RE, math_blocks, body, nested=True)
     
     if debug_marker in body:
         print(f"[DEBUG] Post-restoration: {body[body.find(debug_marker):body.find(debug_marker)+100]}")
@@ -2336,83 +2668,37 @@ def convert_to_html(tex_path, backlinks_map, title_map):
     
     # Convert center environment (do this late to avoid interfering with other blocks)
     # Match \begin{center} ... \end{center}
-    body = re.sub(r'\\begin\{center\}(.*?)\\end\{center\}', r'<div style="text-align: center;">\1</div>', body, flags=re.DOTALL)
+    body = _CENTER_RE.sub(r'<div style="text-align: center;">\1</div>', body)
 
     # Append References if any
     if references:
-        body += '\n<div class="references">\n<h2>References</h2>\n<ol>\n'
-        for i, ref in enumerate(references, 1):
-             body += f'<li id="ref-{i}">{ref}</li>\n'
-        body += '</ol>\n</div>'
+        ref_items = "".join([f'<li id="ref-{i}">{ref}</li>\n' for i, ref in enumerate(references, 1)])
+        body += f'\n<div class="references">\n<h2>References</h2>\n<ol>\n{ref_items}</ol>\n</div>'
 
     # Restore scripts
-    for i, block in enumerate(script_blocks):
-        body = body.replace(f'__SCRIPT_BLOCK_{i}__', block)
+    body = restore_placeholders(_SCRIPT_PLACEHOLDER_RE, script_blocks, body)
 
     body = wrap_paragraphs(body)
 
-    # Extract sections for table of contents
-    sections = re.findall(r'<h2[^>]*id="([^"]+)"[^>]*>(.*?)</h2>', body)
+    # Extract sections for table of contents; the TOC needs at least two
+    # headings, so skip the scan when the body can't have that many
+    sections = _H2_SECTION_RE.findall(body) if body.count('<h2') > 1 else []
     
     # Macros generated dynamically
 
     # Title is now set from filename (no texorpdfstring cleanup needed)
 
     # Generate HTML
-    html_parts = []
-    html_parts.append(f'''<!DOCTYPE html>
-<html lang="en">
-<head>
-    <meta charset="UTF-8">
-    <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>{title} - GWiki</title>
-    <link rel="preconnect" href="https://fonts.googleapis.com">
-    <link rel="preconnect" href="https://fonts.gstatic.com" crossorigin>
-    <link href="https://fonts.googleapis.com/css2?family=Inter:wght@400;600;700&family=JetBrains+Mono:wght@400;500&family=Merriweather:ital,wght@0,300;0,400;0,700;1,400&display=swap" rel="stylesheet">
-    <link rel="stylesheet" type="text/css" href="style.css">
-    <link rel="stylesheet" type="text/css" href="https://tikzjax.com/v1/fonts.css">
-    <script>
-    window.MathJax = {{
-      tex: {{
-        inlineMath: [['$', '$'], ['\\\\(', '\\\\)']],
-        displayMath: [['$$', '$$'], ['\\\\[', '\\\\]']],
-        processEscapes: true,
-        macros: {{
-{generate_macros(file_macros)}
-        }}
-      }},
-      startup: {{
-        typeset: true
-      }}
-    }};
-    </script>
-    <script id="MathJax-script" async src="https://cdn.jsdelivr.net/npm/mathjax@3/es5/tex-mml-chtml.js"></script>
-    <script src="https://tikzjax.com/v1/tikzjax.js"></script>
-</head>
-<body>
-    <div class="top-nav">
-        <div class="nav-left">
-            <a href="../index.html" class="nav-link">
-                <svg width="16" height="16" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2">
-                    <path d="M19 12H5M12 19l-7-7 7-7"/>
-                </svg>
-                <span>Index</span>
-            </a>
-        </div>
-        <div class="nav-right">
-            <a href="../pdfs/{name}.pdf#page=1.00&gsr=0" class="nav-btn" title="View PDF" target="_blank">
-                <span>PDF</span>
-            </a>
-            <a href="obsidian://open?path=/Users/greysonwesley/Desktop/workflow/wiki/{name}.md" class="nav-btn" title="Edit in Obsidian">
-                <span>MD</span>
-            </a>
-        </div>
-    </div>
-    <div class="content-wrapper">
-    <h1>{title}</h1>
-    <div class="metadata">
-        <strong>Last modified:</strong> {last_modified}<br>
-        <strong>Created:</strong> {created_date}<br>''')
+    html_parts = [
+        _HEAD_TO_TITLE, title,
+        _HEAD_TO_MACROS, generate_macros(file_macros),
+        _HEAD_TO_PDF_NAME, name,
+        _HEAD_TO_MD_NAME, name,
+        _HEAD_TO_H1_TITLE, title,
+        _HEAD_TO_LAST_MODIFIED, last_modified,
+        _HEAD_TO_CREATED, created_date,
+        _HEAD_END,
+    ]
 
     if tags:
         html_parts.append(f'''
@@ -2447,89 +2733,165 @@ def convert_to_html(tex_path, backlinks_map, title_map):
 
     # Note: Do NOT append </div> here. The content-wrapper should wrap the content too.
     # We will close content-wrapper at the very end of this function.
-    
-    html = "".join(html_parts)
 
     # Generate TOC HTML if sections exist
     toc_html = ""
-    if sections and len(sections) > 1:
-        toc_html = '''
+    if len(sections) > 1:
+        toc_items = "".join([f'''
+                <li><a href="#{header_id}">{title}</a></li>''' for header_id, title in sections])
+        toc_html = f'''
         <div class="toc-compact">
             <h3>Contents</h3>
-            <ul>'''
-        for header_id, title in sections:
-            toc_html += f'''
-                <li><a href="#{header_id}">{title}</a></li>'''
-        toc_html += '''
+            <ul>{toc_items}
             </ul>
         </div>'''
 
     # Add anchors to sections in body (REMOVED - convert_sections does this)
 
-    html += f'''
+    html_parts.append(f'''
     <div class="content">
         {toc_html}
         {body}
-    </div>'''
+    </div>''')
 
     # Add linked notes section if there are outgoing links
     if outgoing_links:
-        html += '''
-
-    <div class="linked-notes">
-        <h2>Linked Notes</h2>
-        <ul>'''
-        for link in outgoing_links:
-            html += f'''
-            <li><a href="{link}.html">{link}</a></li>'''
-        html += '''
-        </ul>
-    </div>'''
+        html_parts.append(_LINKED_NOTES_OPEN)
+        html_parts.extend(f'''
+            <li><a href="{link}.html">{link}</a></li>''' for link in outgoing_links)
+        html_parts.append(_LIST_SECTION_CLOSE)
 
     # Add backlinks section if there are any
     if backlinks:
-        html += '''
+        html_parts.append(_BACKLINKS_OPEN)
+        html_parts.extend(f'''
+            <li><a href="{backlink}.html">{backlink}</a></li>''' for backlink in sorted(backlinks))
+        html_parts.append(_LIST_SECTION_CLOSE)
 
-    <div class="backlinks">
-        <h2>Backlinks</h2>
-        <ul>'''
-        for backlink in sorted(backlinks):
-            html += f'''
-            <li><a href="{backlink}.html">{backlink}</a></li>'''
-        html += '''
-        </ul>
-    </div>'''
+    html_parts.append(_HTML_TAIL)
 
-    html += '''
-    </div>
-</body>
-</html>
-'''
+    return "".join(html_parts)
+
+_NOCONVERT_RE = re.compile(r'%\s*(noconvert|nochange)', re.IGNORECASE)
+
+def convert_file(tex_path, html_path, backlinks_map, title_map, outgoing_map=None):
+    """Convert one note and write it to html_path. Returns False if skipped."""
+    # Security Check: Respect % noconvert directive
+    try:
+        with open(tex_path, 'r', encoding='utf-8') as f:
+            # Read first 1024 bytes (sufficient for header)
+            chunk = f.read(1024)
+            if _NOCONVERT_RE.search(chunk):
+                print(f"Skipping {tex_path}: marked as % noconvert")
+                return False
+    except Exception as e:
+        print(f"Warning: Could not read {tex_path} for noconvert check: {e}")
+
+    # Ensure output directory exists
+    os.makedirs(os.path.dirname(html_path) or '.', exist_ok=True)
+
+    # Convert
+    html = convert_to_html(tex_path, backlinks_map, title_map, outgoing_map)
+
+    # Write output: encode once and hand the bytes over in a single write
+    data = html.encode('utf-8')
+    with open(html_path, 'wb') as f:
+        f.write(data)
+
+    print(f"✓ Converted: {tex_path} -> {html_path}")
+    return True
 
-    return html
+# Shared (backlinks_map, title_map, outgoing_map) for convert_files worker processes
+_worker_maps = None
+
+def _init_worker(backlinks_map, title_map, outgoing_map):
+    global _worker_maps
+    _worker_maps = (backlinks_map, title_map, outgoing_map)
+
+def _convert_in_worker(job):
+    tex_path, html_path = job
+    return convert_file(tex_path, html_path, *_worker_maps)
+
+def convert_files(jobs, backlinks_map, title_map, max_workers=None, outgoing_map=None):
+    """Convert (tex_path, html_path) pairs in parallel worker processes.
+
+    The maps are sent to each worker once. Returns the number of failures.
+    """
+    failures = 0
+    with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_worker,
+                             initargs=(backlinks_map, title_map, outgoing_map)) as executor:
+        futures = {executor.submit(_convert_in_worker, job): job for job in jobs}
+        for future in as_completed(futures):
+            try:
+                future.result()
+            except Exception as e:
+                print(f"Error converting {futures[future][0]}: {e}")
+                failures += 1
+    return failures
+
+def convert_batch(tex_paths, html_dir):
+    """Convert notes into html_dir, building the shared maps only once.
+
+    Returns the number of failures.
+    """
+    notes_dir = os.path.dirname(tex_paths[0]) or 'notes'
+    backlinks_map, outgoing_map = build_backlinks_map(notes_dir)
+    title_map = build_title_map(notes_dir)
+
+    jobs = []
+    for tex_path in tex_paths:
+        basename = os.path.splitext(os.path.basename(tex_path))[0]
+        jobs.append((tex_path, os.path.join(html_dir, f'{basename}.html')))
+
+    return convert_files(jobs, backlinks_map, title_map, outgoing_map=outgoing_map)
 
 def main():
+    usage = ("Usage: tex-to-html.py <input.tex> [output.html]\n"
+             "       tex-to-html.py --outdir <html_dir> <input.tex>...\n"
+             "       tex-to-html.py --all <notes_dir> [html_dir]")
     if len(sys.argv) < 2:
-        print("Usage: tex-to-html.py <input.tex> [output.html]")
+        print(usage)
         sys.exit(1)
 
+    # Whole-directory mode: every note in notes_dir, one backlinks scan
+    if sys.argv[1] == '--all':
+        if len(sys.argv) < 3:
+            print(usage)
+            sys.exit(1)
+        notes_dir = sys.argv[2]
+        html_dir = sys.argv[3] if len(sys.argv) >= 4 else 'html'
+        if not os.path.isdir(notes_dir):
+            print(f"Error: {notes_dir} not found")
+            sys.exit(1)
+        tex_paths = sorted(os.path.join(notes_dir, name) for name in os.listdir(notes_dir)
+                           if name.endswith('.tex'))
+        if tex_paths and convert_batch(tex_paths, html_dir):
+            sys.exit(1)
+        return
+
+    # Batch mode: convert several notes in parallel into one directory
+    if sys.argv[1] == '--outdir':
+        if len(sys.argv) < 4:
+            print(usage)
+            sys.exit(1)
+        html_dir = sys.argv[2]
+        tex_paths = sys.argv[3:]
+        missing = [p for p in tex_paths if not os.path.exists(p)]
+        if missing:
+            for p in missing:
+                print(f"Error: {p} not found")
+            sys.exit(1)
+
+        if convert_batch(tex_paths, html_dir):
+            sys.exit(1)
+        return
+
     tex_path = sys.argv[1]
 
     if not os.path.exists(tex_path):
         print(f"Error: {tex_path} not found")
         sys.exit(1)
 
-    # Security Check: Respect % noconvert directive
-    try:
-        with open(tex_path, 'r', encoding='utf-8') as f:
-            # Read first 1024 bytes (sufficient for header)
-            chunk = f.read(1024)
-            if re.search(r'%\s*(noconvert|nochange)', chunk, re.IGNORECASE):
-                print(f"Skipping {tex_path}: marked as % noconvert")
-                return
-    except Exception as e:
-        print(f"Warning: Could not read {tex_path} for noconvert check: {e}")
-
     # Determine output path
     if len(sys.argv) >= 3:
         html_path = sys.argv[2]
@@ -2538,22 +2900,12 @@ def main():
         basename = os.path.splitext(os.path.basename(tex_path))[0]
         html_path = os.path.join('html', f'{basename}.html')
 
-    # Ensure output directory exists
-    os.makedirs(os.path.dirname(html_path) or '.', exist_ok=True)
-
     # Build backlinks map from notes directory
     notes_dir = os.path.dirname(tex_path) or 'notes'
-    backlinks_map = build_backlinks_map(notes_dir)
+    backlinks_map, outgoing_map = build_backlinks_map(notes_dir)
     title_map = build_title_map(notes_dir)
 
-    # Convert
-    html = convert_to_html(tex_path, backlinks_map, title_map)
-
-    # Write output
-    with open(html_path, 'w', encoding='utf-8') as f:
-        f.write(html)
-
-    print(f"✓ Converted: {tex_path} -> {html_path}")
+    convert_file(tex_path, html_path, backlinks_map, title_map, outgoing_map)
 
 if __name__ == '__main__':
     main()
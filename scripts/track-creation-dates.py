@@ -11,26 +11,43 @@ Usage:
 """
 
 import json
+import os
+import time
 from pathlib import Path
-from datetime import datetime
+
+try:
+    import orjson  # Optional: faster parsing of large metadata files
+except ImportError:
+    orjson = None
 
 ROOT = Path(__file__).parent.parent
 NOTES_DIR = ROOT / "notes"
 METADATA_FILE = ROOT / ".gwiki-metadata.json"
 
 
+def format_date(timestamp):
+    """YYYY-MM-DD for a timestamp in local time, without a datetime object."""
+    t = time.localtime(timestamp)
+    return f"{t.tm_year:04d}-{t.tm_mon:02d}-{t.tm_mday:02d}"
+
+
 def load_metadata():
     """Load existing metadata or return empty dict."""
     if METADATA_FILE.exists():
         try:
-            return json.loads(METADATA_FILE.read_text())
+            data = METADATA_FILE.read_bytes()
+            return orjson.loads(data) if orjson else json.loads(data)
         except:
             return {}
     return {}
 
 
 def save_metadata(data):
-    """Save metadata to disk."""
+    """Save metadata to disk.
+
+    Always written by the stdlib encoder: orjson can't escape non-ASCII,
+    and the tracked file should not change format with the installed packages.
+    """
     METADATA_FILE.write_text(json.dumps(data, indent=2, sort_keys=True))
 
 
@@ -44,19 +61,24 @@ def track_creation_dates():
     creation_dates = metadata['creation_dates']
     new_count = 0
 
-    for tex_file in NOTES_DIR.glob("*.tex"):
-        note_name = tex_file.stem
-
-        # Skip if we already have a creation date
-        if note_name in creation_dates:
-            continue
-
-        # Record creation date from file system
-        stat = tex_file.stat()
-        # Use birth time if available (macOS), else modification time
-        created = getattr(stat, 'st_birthtime', stat.st_mtime)
-        creation_dates[note_name] = datetime.fromtimestamp(created).strftime('%Y-%m-%d')
-        new_count += 1
+    # scandir hands back names without building Path objects, and known
+    # notes are skipped before any stat call
+    with os.scandir(NOTES_DIR) as entries:
+        for entry in entries:
+            if not entry.name.endswith('.tex'):
+                continue
+            note_name = entry.name[:-4]
+
+            # Skip if we already have a creation date
+            if note_name in creation_dates:
+                continue
+
+            # Record creation date from file system
+            stat = entry.stat()
+            # Use birth time if available (macOS), else modification time
+            created = getattr(stat, 'st_birthtime', stat.st_mtime)
+            creation_dates[note_name] = format_date(created)
+            new_count += 1
 
     if new_count > 0:
         save_metadata(metadata)
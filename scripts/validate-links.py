@@ -20,6 +20,12 @@ NOTES_DIR = ROOT / "notes"
 
 STRICT = "--strict" in sys.argv
 
+# A target never spans lines, as when the file was matched line by line
+_WREF_RE = re.compile(rb'\\wref\{([^}\n]+)\}')
+# Line breaks str.splitlines() honours besides \n, as UTF-8 bytes
+_RARE_LINE_BREAKS = (b'\r', b'\x0b', b'\x0c', b'\x1c', b'\x1d', b'\x1e',
+                     b'\xc2\x85', b'\xe2\x80\xa8', b'\xe2\x80\xa9')
+
 
 def extract_wref_links(tex_file: Path):
     """
@@ -27,34 +33,60 @@ def extract_wref_links(tex_file: Path):
 
     Returns list of (line_number, target) tuples.
     """
+    # The patterns are ASCII, so the file is matched as bytes and only the
+    # link targets are decoded
     try:
-        content = tex_file.read_text(encoding='utf-8')
+        content = tex_file.read_bytes()
     except Exception as e:
         print(f"Warning: Could not read {tex_file}: {e}")
         return []
 
+    # Lines are those of str.splitlines(). The scan below only breaks at \n,
+    # so a file holding any other line break is rebuilt with \n breaks first
+    if any(brk in content for brk in _RARE_LINE_BREAKS):
+        try:
+            text = content.decode('utf-8')
+        except UnicodeDecodeError as e:
+            print(f"Warning: Could not read {tex_file}: {e}")
+            return []
+        content = '\n'.join(text.splitlines()).encode('utf-8')
+
     links = []
-    lines = content.splitlines()
+    # Line numbers are counted incrementally between matches, so the file
+    # is scanned once and never split into lines
+    line_num = 1
+    counted_to = 0
+
+    # Find all \wref{target} patterns
+    # Handle both \wref{target} and \wref{target#section}
+    for match in _WREF_RE.finditer(content):
+        start = match.start()
+        line_num += content.count(b'\n', counted_to, start)
+        counted_to = start
+
+        # Only the line prefix and the target are decoded. The prefix is
+        # stripped as str, so Unicode spaces before a % still mark a comment
+        line_start = content.rfind(b'\n', 0, start) + 1
+        try:
+            prefix = content[line_start:start].decode('utf-8')
+            target = match.group(1).decode('utf-8')
+        except UnicodeDecodeError as e:
+            print(f"Warning: Could not read {tex_file}: {e}")
+            return []
 
-    for line_num, line in enumerate(lines, 1):
         # Skip comments
-        if re.match(r'^\s*%', line):
+        if prefix.lstrip().startswith('%'):
             continue
 
-        # Find all \wref{target} patterns
-        # Handle both \wref{target} and \wref{target#section}
-        for match in re.finditer(r'\\wref\{([^}]+)\}', line):
-            target = match.group(1)
+        # Strip section references (e.g., "note#sec:intro" -> "note")
+        if '#' in target:
+            target = target.split('#')[0]
 
-            # Strip section references (e.g., "note#sec:intro" -> "note")
-            if '#' in target:
-                target = target.split('#')[0]
-
-            # Skip internal references (starting with #)
-            if target.startswith('#'):
-                continue
+        # Skip internal references (starting with #)
+        if target.startswith('#'):
+            continue
 
-            links.append((line_num, target.strip()))
+        links.append((line_num, target.strip()))
 
     return links
 